@@ -1,6 +1,8 @@
 #include <stdio.h>
 #include <limits>
 #include <algorithm>
+#include <functional>
+#include <numeric>
 #include "ecca.h"
 #include "individual.h"
 
@@ -17,146 +19,142 @@ Ecca::~Ecca() {
 individual_t
 Ecca::Run(std::vector<float> energies) {
   ClearLearningTraces();
-  InitializeSessionData(energies);
+  InitializeSessionData(std::move(energies));
 
   CreatePopulation();
-  auto fronts = FastNonDominatedSort(population_);
   float crossover_rate = 0.98;
   auto children = Reproduce(population_, crossover_rate);
 
   for (unsigned int it = 0; it < max_iterations_; it++) {
+    if (ShouldStop())
+      break;
     PushIntoLearningTraces(best_global_.GetFitness());
     population_.insert(population_.end(), children.begin(), children.end());
-    for (unsigned int idx = 0; idx<population_.size(); idx++)
-      population_[idx].idx_ = idx;
     //auto new_population_fitness = population_fitness + children_fitness;
-    fronts = FastNonDominatedSort(population_);
-    auto parents = FindBestParents(fronts);
-    std::random_shuffle(parents.begin(), parents.end());
+    auto fronts = FastNonDominatedSort(population_);
+    auto selected = FindBestParents(population_, fronts);
+    // shuffled with the optimizer's generator: std::random_shuffle draws
+    // from rand(), whose state is shared by all optimizers of the process
+    std::shuffle(selected.begin(), selected.end(), Generator());
     // TODO randomly select some parents
-    population_ = children;
+    std::vector<Individual> parents;
+    for (auto const &idx: selected)
+      parents.push_back(std::move(population_[idx]));
+    population_ = std::move(children);
     children = Reproduce(parents, crossover_rate);
   } 
 
-  population_.insert(population_.end(), children.begin(), children.end());
-  for (unsigned int idx = 0; idx<population_.size(); idx++)
-    population_[idx].idx_ = idx;
-  fronts = FastNonDominatedSort(population_);
-  auto parents = FindBestParents(fronts);
-
-  return best_global_.GetGenes();
+  FinalizeSessionData();
+  return best_global_.GetGenes().Unpack();
 }
 
 // private methods
 
-std::vector<std::vector<Individual>>
+// Returns the fronts (indexes of the individuals of each rank) and stores
+// the rank in every individual. With two objectives, individuals are swept
+// by decreasing first objective, keeping the best second objective found
+// in each front so far; the rank of an individual is the first front whose
+// best does not dominate it (binary search). O(P log P) instead of compar-
+// ing every pair of individuals.
+std::vector<std::vector<unsigned int>>
 Ecca::FastNonDominatedSort(std::vector<Individual> &population) {
-  // each index in fronts represent a single rank, that contain all
-  // individuals that have that rank
-  std::vector<std::vector<Individual>> fronts;
-
-  std::vector<unsigned int> dom_count =  
-    std::vector<unsigned int>(population.size(), 0);
-  std::vector<std::vector<unsigned int>> dom_set = 
-    std::vector<std::vector<unsigned int>>(population.size(),
-                                           std::vector<unsigned int>());
-
-  // find front0 and calculate rank 0 (store it in every individual)
-  std::vector<Individual> front0;
-  for (unsigned int idx1 = 0; idx1<population.size(); idx1++) {
-    auto &individual1 = population[idx1];
-    for (unsigned int idx2 = 0; idx2<population.size(); idx2++) {
-      if (idx1 == idx2)
-        continue;
-      auto &individual2 = population[idx2];
-      if (Dominates(individual1, individual2))
-        dom_set[idx1].push_back(idx2);
-      else if (Dominates(individual2, individual1))
-        dom_count[idx1]++;
+  std::vector<std::pair<float, float>> objectives;
+  for (auto const &individual: population)
+    objectives.push_back(Objectives(individual));
+
+  std::vector<unsigned int> order(population.size());
+  std::iota(order.begin(), order.end(), 0);
+  std::sort(order.begin(), order.end(),
+            [&objectives](unsigned int lhs, unsigned int rhs) {
+              return objectives[lhs].first > objectives[rhs].first;
+            });
+
+  // highest second objective in each front (decreases with the rank)
+  std::vector<float> best_second;
+  unsigned int begin = 0;
+  while (begin < order.size()) {
+    // individuals with the same first objective do not dominate each other,
+    // so they are ranked before any of them is added to the fronts
+    unsigned int end = begin;
+    while (end < order.size() &&
+           objectives[order[end]].first == objectives[order[begin]].first)
+      end++;
+    for (unsigned int pos = begin; pos < end; pos++) {
+      float second = objectives[order[pos]].second;
+      auto front = std::lower_bound(best_second.begin(), best_second.end(),
+                                    second, std::greater<float>());
+      population[order[pos]].rank_ = front - best_second.begin();
     }
-    if (dom_count[idx1] == 0) {
-      population[idx1].rank_ = 0;
-      front0.push_back(population[idx1]);
+    for (unsigned int pos = begin; pos < end; pos++) {
+      unsigned int rank = population[order[pos]].rank_;
+      float second = objectives[order[pos]].second;
+      if (rank == best_second.size())
+        best_second.push_back(second);
+      else
+        best_second[rank] = std::max(best_second[rank], second);
     }
+    begin = end;
   }
-  fronts.push_back(front0);
-
-  // calculate higher-ranked fronts
-  unsigned int curr = 0;
-  do {
-    std::vector<Individual> next_front;
-    for (auto &individual1: fronts[curr]) {
-      for (auto &idx2: dom_set[individual1.idx_]) {
-        auto individual2 = population[idx2];
-        dom_count[individual2.idx_]--;
-        if (dom_count[individual2.idx_] == 0) {
-          individual2.rank_ = curr+1;
-          next_front.push_back(individual2);
-        }
-      }
-    }
-    curr++;
-    if (next_front.size() != 0) {
-      fronts.push_back(next_front);
-    }
-  } while (curr < fronts.size());
+
+  std::vector<std::vector<unsigned int>> fronts(best_second.size());
+  for (unsigned int idx = 0; idx < population.size(); idx++)
+    fronts[population[idx].rank_].push_back(idx);
   return fronts;
 }
 
-bool
-Ecca::Dominates(Individual &individual1, Individual &individual2) {
-  if (fitness_alpha_ != 0.0 && fitness_beta_ != 0.0) {
-    if ((individual1.GetFitness().term1 > individual2.GetFitness().term1) &&
-        (individual1.GetFitness().term2 > individual2.GetFitness().term2))
-      return true;
-  } else if (fitness_alpha_ != 0.0 && fitness_beta_ == 0.0) {
-    if (individual1.GetFitness().term1 > individual2.GetFitness().term1)
-      return true;
-  } else if (fitness_alpha_ == 0.0 && fitness_beta_ != 0.0) {
-    if (individual1.GetFitness().term2 > individual2.GetFitness().term2)
-      return true;
-  }
-  return false;
+// Returns the objectives of individual. An individual dominates another
+// if both of its objectives are greater (an objective with zero weight is
+// ignored).
+std::pair<float, float>
+Ecca::Objectives(const Individual &individual) {
+  auto const &fitness = individual.GetFitness();
+  if (fitness_alpha_ != 0.0 && fitness_beta_ != 0.0)
+    return std::make_pair(fitness.term1, fitness.term2);
+  else if (fitness_alpha_ != 0.0 && fitness_beta_ == 0.0)
+    return std::make_pair(fitness.term1, fitness.term1);
+  else if (fitness_alpha_ == 0.0 && fitness_beta_ != 0.0)
+    return std::make_pair(fitness.term2, fitness.term2);
+  // no objective: nobody dominates
+  return std::make_pair(0.0f, 0.0f);
 }
 
 std::vector<Individual>
 Ecca::Reproduce(std::vector<Individual> &population, float crossover_rate) {
-  std::vector<Individual> children;
+  std::vector<Individual> children(population.size());
   
-  for (unsigned int idx1=0; idx1<population.size(); idx1++) {
-    auto individual1 = population[idx1];
+  ParallelFor(population.size(), [&](unsigned int idx1) {
+    const auto &individual1 = population[idx1];
     unsigned int idx2 = (idx1%2==0) ? idx1+1 : idx1-1;
-    auto individual2 = (idx2 == population.size()) ? population[0] : population[idx2];
+    const auto &individual2 = (idx2 == population.size()) ? population[0] : population[idx2];
 
-    Individual child = Individual(idx1, individual1, individual2, crossover_rate, this);
-    children.push_back(child);
-    if (children.size() >= population.size()) 
-      break;
-  }
+    children[idx1] = Individual(idx1, individual1, individual2, crossover_rate, this);
+  });
+  UpdateBestGlobal(children);
 
   return children;
 }
 
-std::vector<Individual>
-Ecca::FindBestParents(std::vector<std::vector<Individual>> &fronts) {
-  std::vector<Individual> offspring;
+// Returns the indexes of the individuals selected as parents
+std::vector<unsigned int>
+Ecca::FindBestParents(std::vector<Individual> &population,
+                      std::vector<std::vector<unsigned int>> &fronts) {
+  std::vector<unsigned int> offspring;
   unsigned int last_front = 0;
 
   for (auto &front: fronts) {
-    CalculateCrowdingDistance(front);
+    CalculateCrowdingDistance(population, front);
     if (offspring.size()+front.size() > nb_individuals_)
       break;
-    for (auto &individual: front)
-      offspring.push_back(individual);
+    offspring.insert(offspring.end(), front.begin(), front.end());
     last_front++;
   }
 
   unsigned int remaining = nb_individuals_-offspring.size();
-  if (remaining > 0) {
+  if (remaining > 0 && last_front < fronts.size()) {
     // sort according to crowd_dist_ (ascending)
     std::sort(fronts[last_front].begin(), fronts[last_front].end(),
-              [](const Individual &lhs, const Individual &rhs) {
-                return lhs.crowd_dist_ < rhs.crowd_dist_;
+              [&population](unsigned int lhs, unsigned int rhs) {
+                return population[lhs].crowd_dist_ < population[rhs].crowd_dist_;
               });
 
     offspring.insert(offspring.end(), fronts[last_front].begin(),
@@ -167,10 +165,12 @@ Ecca::FindBestParents(std::vector<std::vector<Individual>> &fronts) {
 }
 
 void
-Ecca::CalculateCrowdingDistance(std::vector<Individual> &group) {
+Ecca::CalculateCrowdingDistance(std::vector<Individual> &population,
+                                const std::vector<unsigned int> &group) {
   float max1 = 0.0, min1 = std::numeric_limits<float>::max();
   float max2 = 0.0, min2 = std::numeric_limits<float>::max();
-  for (auto &individual: group) {
+  for (auto const &idx: group) {
+    auto &individual = population[idx];
     individual.crowd_dist_ = 0.0;
     // find max and min fitness values in group (for each objective)
     if (individual.fitness_.term1 > max1)
@@ -187,17 +187,21 @@ Ecca::CalculateCrowdingDistance(std::vector<Individual> &group) {
   float rge2 = max2 - min2;
 
   // first and last value are set to infinity
-  group.front().crowd_dist_ = std::numeric_limits<float>::max();
-  group.back().crowd_dist_  = std::numeric_limits<float>::max();
+  population[group.front()].crowd_dist_ = std::numeric_limits<float>::max();
+  population[group.back()].crowd_dist_  = std::numeric_limits<float>::max();
 
   if (rge1 != 0.0) {
     for (unsigned int idx=1; idx<group.size()-1; idx++) {
-      group[idx].crowd_dist_ += (group[idx+1].fitness_.term1 - group[idx-1].fitness_.term1)/rge1;
+      population[group[idx]].crowd_dist_ +=
+        (population[group[idx+1]].fitness_.term1 -
+         population[group[idx-1]].fitness_.term1)/rge1;
     }  
   }
   if (rge2 != 0.0) {
     for (unsigned int idx=1; idx<group.size()-1; idx++) {
-      group[idx].crowd_dist_ += (group[idx+1].fitness_.term2 - group[idx-1].fitness_.term2)/rge2;
+      population[group[idx]].crowd_dist_ +=
+        (population[group[idx+1]].fitness_.term2 -
+         population[group[idx-1]].fitness_.term2)/rge2;
     }  
   }
 }
@@ -217,13 +221,8 @@ Ecca::CrowdedSorting(std::vector<Individual> &group) {
 
 fitness_t
 Ecca::Fitness(Individual &individual) {
-  u_int nb_active_nodes = 0;
-  auto genes = individual.GetGenes();
-  for (unsigned int idx = 0; idx < nb_nodes_; idx++)
-    if (genes[idx] == 0 && energies_[idx] != 0.0) // active nodes
-      nb_active_nodes++;
-
-  auto coverage_info = regions_->GetCoverage(genes, energies_);
+  auto coverage_info = Evaluate(individual);
+  u_int nb_active_nodes = individual.evaluation_.nb_active_nodes;
 
   float total, term1 = 0.0, term2 = 0.0;
   if (nb_alive_nodes_ != 0)
@@ -241,8 +240,7 @@ Ecca::Fitness(Individual &individual) {
 
   individual.SetFitness(fitness_ret);
 
-  if (fitness_ret.total > best_global_.GetFitness().total)
-    best_global_ = individual;
+  UpdateBestGlobal(individual);
 
   return fitness_ret;
 }
@@ -25,19 +25,21 @@ class Ecca: public Optimizer {
     
     //std::vector<Individual> CreatePopulation1();
 
-    std::vector<std::vector<Individual>>  
+    // fronts hold indexes into population, individuals are never copied
+    std::vector<std::vector<unsigned int>>
     FastNonDominatedSort(std::vector<Individual> &population);
 
-    bool Dominates(Individual &individual1,
-                   Individual &individual2);
+    std::pair<float, float> Objectives(const Individual &individual);
 
     std::vector<Individual>
     Reproduce(std::vector<Individual> &population, float crossover_rate);
 
-    std::vector<Individual>
-    FindBestParents(std::vector<std::vector<Individual>> &fronts);
+    std::vector<unsigned int>
+    FindBestParents(std::vector<Individual> &population,
+                    std::vector<std::vector<unsigned int>> &fronts);
 
-    void CalculateCrowdingDistance(std::vector<Individual> &group);
+    void CalculateCrowdingDistance(std::vector<Individual> &population,
+                                   const std::vector<unsigned int> &group);
 
     void CrowdedSorting(std::vector<Individual> &group);
 
@@ -19,6 +19,8 @@ GeneticAlgorithm::Optimize(const vector<u_int> &can_sleep) {
 
   float mutation_rate, crossover_rate;
   for (u_int it = 0; it < max_iterations_; it++) {
+    if (ShouldStop())
+      break;
     float previous_best_global = best_global_.GetFitness().total;
     crossover_rate = 1.0 - it/float(max_iterations_);
     if (lod >= 3)
@@ -31,14 +33,24 @@ GeneticAlgorithm::Optimize(const vector<u_int> &can_sleep) {
     // only worst fit individuals are replaced
     // best fit are cloned for the next generation
     u_int nb_unfit = 0.6*nb_individuals_; // selection_rate
-    uniform_real_distribution<float> distribution(0.0, 1.0);
-    for (u_int idx = nb_unfit; idx < population_.size(); idx++) {
-      auto &individual = population_[idx];
-
-      if (distribution(generator_) < crossover_rate)
+    // in parallel, the new individuals are written apart, since crossovers
+    // read the current population
+    vector<Individual> offspring;
+    if (IsParallel())
+      offspring = population_;
+    auto &next_population = IsParallel() ? offspring : population_;
+    ParallelFor(population_.size()-nb_unfit, [&](u_int pos) {
+      uniform_real_distribution<float> distribution(0.0, 1.0);
+      auto &individual = next_population[nb_unfit+pos];
+
+      if (distribution(Generator()) < crossover_rate)
         individual = Crossover(nb_unfit, can_sleep);
 
       Mutate(individual, can_sleep, mutation_rate);
+    });
+    if (IsParallel()) {
+      population_ = std::move(offspring);
+      UpdateBestGlobal(population_);
     }
 
     SortFitness();
@@ -64,21 +76,14 @@ GeneticAlgorithm::SortFitness() {
 
 void
 GeneticAlgorithm::Mutate(Individual &individual,
-                         vector<u_int> can_sleep,
+                         const vector<u_int> &can_sleep,
                          float mutation_rate) {
 
   u_int nb_changes = u_int(float(can_sleep.size())*mutation_rate);
-  auto genes = individual.GetGenes();
-  for(u_int count = 0; count < nb_changes; count++) {
-    uniform_int_distribution<int> distribution(0, can_sleep.size()-1);
-    u_int changed_idx = distribution(generator_);
-    u_int changed_gene = can_sleep[changed_idx];
-
-    // flips gene
-    genes[changed_gene] = (genes[changed_gene] == 0) ? 1 : 0;
-    can_sleep.erase(can_sleep.begin() + changed_idx);
-  }
-  individual.SetGenes(genes);
+  Genome changes(nb_nodes_);
+  SampleGenes(can_sleep, nb_changes, changes);
+  // flips genes
+  individual.FlipGenes(changes);
 }
 
 Individual
@@ -89,15 +94,17 @@ GeneticAlgorithm::Crossover(u_int nb_unfit,
   // choose father and mother from best fit individuals
   uniform_int_distribution<int> int_distribution(0, nb_unfit);
   // father and mother may be the same individual
-  auto &father = population_[int_distribution(generator_)];
-  auto &mother = population_[int_distribution(generator_)];
+  auto &father = population_[int_distribution(Generator())];
+  auto &mother = population_[int_distribution(Generator())];
 
   // half of the genes comes from father and half from mother
   Individual child = Individual(0, this);
-  auto genes = child.GetGenes();
+  Genome genes = child.GetGenes();
+  const auto &father_genes = father.GetGenes();
+  const auto &mother_genes = mother.GetGenes();
   for (auto const &gene: can_sleep) {
-    float random = distribution(generator_);
-    genes[gene] = (random < 0.5) ? father.GetGenes()[gene]: mother.GetGenes()[gene];
+    float random = distribution(Generator());
+    genes.Set(gene, (random < 0.5) ? father_genes[gene]: mother_genes[gene]);
   }
   child.SetGenes(genes);
   return child;
@@ -105,16 +112,9 @@ GeneticAlgorithm::Crossover(u_int nb_unfit,
 
 fitness_t
 GeneticAlgorithm::Fitness(Individual &individual) {
-  float partial_energy = 0.0;
-  u_int nb_active_nodes = 0;
-  auto genes = individual.GetGenes();
-  for (u_int idx = 0; idx < nb_nodes_; idx++)
-    if (genes[idx] == 0 && energies_[idx] != 0.0) { // active nodes
-      partial_energy += energies_[idx];
-      nb_active_nodes++;
-    }
-
-  auto coverage_info = regions_->GetCoverage(genes, energies_);
+  auto coverage_info = Evaluate(individual);
+  float partial_energy  = individual.evaluation_.partial_energy;
+  u_int nb_active_nodes = individual.evaluation_.nb_active_nodes;
 
   float term1 = 0.0, term2 = 0.0, term3 = 0.0;
   if (total_energy_ != 0.0)
@@ -137,8 +137,7 @@ GeneticAlgorithm::Fitness(Individual &individual) {
 
   individual.SetFitness(fitness_ret);
 
-  if (fitness_ret.total > best_global_.GetFitness().total)
-    best_global_ = individual;
+  UpdateBestGlobal(individual);
 
   return fitness_ret;
 
@@ -22,7 +22,7 @@ class GeneticAlgorithm: public Optimizer {
   private:
     // change individual's position randomly (random walk). The number of
     // altered genes is proportional to mutation_rate
-    void Mutate(Individual &individual, vector<u_int> can_sleep, 
+    void Mutate(Individual &individual, const vector<u_int> &can_sleep,
                 float mutation_rate);
 
     // individual1 copy parts of individual2 position depending on influence
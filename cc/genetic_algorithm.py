@@ -4,6 +4,11 @@
 # Do not make changes to this file unless you know what you are doing--modify
 # the SWIG interface file instead.
 
+
+import numpy
+
+
+
 from sys import version_info as _swig_python_version_info
 if _swig_python_version_info >= (2, 7, 0):
     def swig_import_helper():
@@ -385,119 +390,6 @@ class regions_t(_object):
 regions_t_swigregister = _genetic_algorithm.regions_t_swigregister
 regions_t_swigregister(regions_t)
 
-class individual_t(_object):
-    __swig_setmethods__ = {}
-    __setattr__ = lambda self, name, value: _swig_setattr(self, individual_t, name, value)
-    __swig_getmethods__ = {}
-    __getattr__ = lambda self, name: _swig_getattr(self, individual_t, name)
-    __repr__ = _swig_repr
-
-    def iterator(self):
-        return _genetic_algorithm.individual_t_iterator(self)
-    def __iter__(self):
-        return self.iterator()
-
-    def __nonzero__(self):
-        return _genetic_algorithm.individual_t___nonzero__(self)
-
-    def __bool__(self):
-        return _genetic_algorithm.individual_t___bool__(self)
-
-    def __len__(self):
-        return _genetic_algorithm.individual_t___len__(self)
-
-    def __getslice__(self, i, j):
-        return _genetic_algorithm.individual_t___getslice__(self, i, j)
-
-    def __setslice__(self, *args):
-        return _genetic_algorithm.individual_t___setslice__(self, *args)
-
-    def __delslice__(self, i, j):
-        return _genetic_algorithm.individual_t___delslice__(self, i, j)
-
-    def __delitem__(self, *args):
-        return _genetic_algorithm.individual_t___delitem__(self, *args)
-
-    def __getitem__(self, *args):
-        return _genetic_algorithm.individual_t___getitem__(self, *args)
-
-    def __setitem__(self, *args):
-        return _genetic_algorithm.individual_t___setitem__(self, *args)
-
-    def pop(self):
-        return _genetic_algorithm.individual_t_pop(self)
-
-    def append(self, x):
-        return _genetic_algorithm.individual_t_append(self, x)
-
-    def empty(self):
-        return _genetic_algorithm.individual_t_empty(self)
-
-    def size(self):
-        return _genetic_algorithm.individual_t_size(self)
-
-    def swap(self, v):
-        return _genetic_algorithm.individual_t_swap(self, v)
-
-    def begin(self):
-        return _genetic_algorithm.individual_t_begin(self)
-
-    def end(self):
-        return _genetic_algorithm.individual_t_end(self)
-
-    def rbegin(self):
-        return _genetic_algorithm.individual_t_rbegin(self)
-
-    def rend(self):
-        return _genetic_algorithm.individual_t_rend(self)
-
-    def clear(self):
-        return _genetic_algorithm.individual_t_clear(self)
-
-    def get_allocator(self):
-        return _genetic_algorithm.individual_t_get_allocator(self)
-
-    def pop_back(self):
-        return _genetic_algorithm.individual_t_pop_back(self)
-
-    def erase(self, *args):
-        return _genetic_algorithm.individual_t_erase(self, *args)
-
-    def __init__(self, *args):
-        this = _genetic_algorithm.new_individual_t(*args)
-        try:
-            self.this.append(this)
-        except __builtin__.Exception:
-            self.this = this
-
-    def push_back(self, x):
-        return _genetic_algorithm.individual_t_push_back(self, x)
-
-    def front(self):
-        return _genetic_algorithm.individual_t_front(self)
-
-    def back(self):
-        return _genetic_algorithm.individual_t_back(self)
-
-    def assign(self, n, x):
-        return _genetic_algorithm.individual_t_assign(self, n, x)
-
-    def resize(self, *args):
-        return _genetic_algorithm.individual_t_resize(self, *args)
-
-    def insert(self, *args):
-        return _genetic_algorithm.individual_t_insert(self, *args)
-
-    def reserve(self, n):
-        return _genetic_algorithm.individual_t_reserve(self, n)
-
-    def capacity(self):
-        return _genetic_algorithm.individual_t_capacity(self)
-    __swig_destroy__ = _genetic_algorithm.delete_individual_t
-    __del__ = lambda self: None
-individual_t_swigregister = _genetic_algorithm.individual_t_swigregister
-individual_t_swigregister(individual_t)
-
 class float_v(_object):
     __swig_setmethods__ = {}
     __setattr__ = lambda self, name, value: _swig_setattr(self, float_v, name, value)
@@ -724,119 +616,6 @@ class vector1(_object):
 vector1_swigregister = _genetic_algorithm.vector1_swigregister
 vector1_swigregister(vector1)
 
-class vector2(_object):
-    __swig_setmethods__ = {}
-    __setattr__ = lambda self, name, value: _swig_setattr(self, vector2, name, value)
-    __swig_getmethods__ = {}
-    __getattr__ = lambda self, name: _swig_getattr(self, vector2, name)
-    __repr__ = _swig_repr
-
-    def iterator(self):
-        return _genetic_algorithm.vector2_iterator(self)
-    def __iter__(self):
-        return self.iterator()
-
-    def __nonzero__(self):
-        return _genetic_algorithm.vector2___nonzero__(self)
-
-    def __bool__(self):
-        return _genetic_algorithm.vector2___bool__(self)
-
-    def __len__(self):
-        return _genetic_algorithm.vector2___len__(self)
-
-    def __getslice__(self, i, j):
-        return _genetic_algorithm.vector2___getslice__(self, i, j)
-
-    def __setslice__(self, *args):
-        return _genetic_algorithm.vector2___setslice__(self, *args)
-
-    def __delslice__(self, i, j):
-        return _genetic_algorithm.vector2___delslice__(self, i, j)
-
-    def __delitem__(self, *args):
-        return _genetic_algorithm.vector2___delitem__(self, *args)
-
-    def __getitem__(self, *args):
-        return _genetic_algorithm.vector2___getitem__(self, *args)
-
-    def __setitem__(self, *args):
-        return _genetic_algorithm.vector2___setitem__(self, *args)
-
-    def pop(self):
-        return _genetic_algorithm.vector2_pop(self)
-
-    def append(self, x):
-        return _genetic_algorithm.vector2_append(self, x)
-
-    def empty(self):
-        return _genetic_algorithm.vector2_empty(self)
-
-    def size(self):
-        return _genetic_algorithm.vector2_size(self)
-
-    def swap(self, v):
-        return _genetic_algorithm.vector2_swap(self, v)
-
-    def begin(self):
-        return _genetic_algorithm.vector2_begin(self)
-
-    def end(self):
-        return _genetic_algorithm.vector2_end(self)
-
-    def rbegin(self):
-        return _genetic_algorithm.vector2_rbegin(self)
-
-    def rend(self):
-        return _genetic_algorithm.vector2_rend(self)
-
-    def clear(self):
-        return _genetic_algorithm.vector2_clear(self)
-
-    def get_allocator(self):
-        return _genetic_algorithm.vector2_get_allocator(self)
-
-    def pop_back(self):
-        return _genetic_algorithm.vector2_pop_back(self)
-
-    def erase(self, *args):
-        return _genetic_algorithm.vector2_erase(self, *args)
-
-    def __init__(self, *args):
-        this = _genetic_algorithm.new_vector2(*args)
-        try:
-            self.this.append(this)
-        except __builtin__.Exception:
-            self.this = this
-
-    def push_back(self, x):
-        return _genetic_algorithm.vector2_push_back(self, x)
-
-    def front(self):
-        return _genetic_algorithm.vector2_front(self)
-
-    def back(self):
-        return _genetic_algorithm.vector2_back(self)
-
-    def assign(self, n, x):
-        return _genetic_algorithm.vector2_assign(self, n, x)
-
-    def resize(self, *args):
-        return _genetic_algorithm.vector2_resize(self, *args)
-
-    def insert(self, *args):
-        return _genetic_algorithm.vector2_insert(self, *args)
-
-    def reserve(self, n):
-        return _genetic_algorithm.vector2_reserve(self, n)
-
-    def capacity(self):
-        return _genetic_algorithm.vector2_capacity(self)
-    __swig_destroy__ = _genetic_algorithm.delete_vector2
-    __del__ = lambda self: None
-vector2_swigregister = _genetic_algorithm.vector2_swigregister
-vector2_swigregister(vector2)
-
 class dict_t(_object):
     __swig_setmethods__ = {}
     __setattr__ = lambda self, name, value: _swig_setattr(self, dict_t, name, value)
@@ -1275,7 +1054,13 @@ class Optimizer(_object):
     __del__ = lambda self: None
 
     def Run(self, energies):
-        return _genetic_algorithm.Optimizer_Run(self, energies)
+        val = _genetic_algorithm.Optimizer_Run(self, energies)
+
+        val = numpy.frombuffer(val, dtype=numpy.uint8)
+
+
+        return val
+
 
     def SetAlpha(self, value):
         return _genetic_algorithm.Optimizer_SetAlpha(self, value)
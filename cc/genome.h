@@ -0,0 +1,78 @@
+// Bit-packed genome: one bit per node (1: sleeping, 0: active), stored in
+// 64-bit words, so that genes can be counted and combined a whole word at
+// a time. Bits past the last gene are always zero.
+
+#ifndef GENOME_H
+#define GENOME_H
+
+#include <cstddef>
+#include <vector>
+
+class Genome {
+  public:
+    typedef unsigned long long word_t;
+    static const unsigned int kWordSize = 64;
+
+    Genome() : nb_genes_(0) {}
+    explicit Genome(unsigned int nb_genes)
+        : nb_genes_(nb_genes),
+          words_((nb_genes+kWordSize-1)/kWordSize, 0) {}
+
+    std::size_t size() const { return nb_genes_; }
+
+    char operator[](unsigned int idx) const {
+      return (words_[idx/kWordSize] >> (idx%kWordSize)) & 1;
+    }
+
+    void Set(unsigned int idx, char gene) {
+      word_t bit = word_t(1) << (idx%kWordSize);
+      if (gene)
+        words_[idx/kWordSize] |= bit;
+      else
+        words_[idx/kWordSize] &= ~bit;
+    }
+
+    void Flip(unsigned int idx) {
+      words_[idx/kWordSize] ^= word_t(1) << (idx%kWordSize);
+    }
+
+    // number of genes set
+    unsigned int Count() const {
+      unsigned int count = 0;
+      for (auto const &word: words_)
+        count += __builtin_popcountll(word);
+      return count;
+    }
+
+    Genome &operator&=(const Genome &other) {
+      for (unsigned int idx = 0; idx < words_.size(); idx++)
+        words_[idx] &= other.words_[idx];
+      return *this;
+    }
+
+    Genome &operator^=(const Genome &other) {
+      for (unsigned int idx = 0; idx < words_.size(); idx++)
+        words_[idx] ^= other.words_[idx];
+      return *this;
+    }
+
+    // calls function(idx) for every gene set, in increasing order
+    template <typename Function>
+    void ForEachSet(Function function) const {
+      for (unsigned int word_idx = 0; word_idx < words_.size(); word_idx++)
+        for (word_t word = words_[word_idx]; word != 0; word &= word-1)
+          function(word_idx*kWordSize + __builtin_ctzll(word));
+    }
+
+    // genes unpacked one per byte
+    std::vector<unsigned char> Unpack() const {
+      std::vector<unsigned char> genes(nb_genes_, 0);
+      ForEachSet([&](unsigned int idx) { genes[idx] = 1; });
+      return genes;
+    }
+
+  private:
+    std::size_t nb_genes_;
+    std::vector<word_t> words_;
+};
+#endif //GENOME_H
@@ -5,55 +5,59 @@
 // declaration of static members
 //fitness_t Individual::best_global_;
 //std::vector<char> Individual::best_genes_;
-Optimizer* Individual::optimizer_;
 //unsigned int Individual::fresh_run_;
-std::default_random_engine Individual::generator_;
 
 
 Individual::Individual() {
   idx_ = 0;
   optimizer_ = NULL;
   fitness_.total = 0.0;
+  evaluation_.session = 0;
 }
 
 Individual::Individual(unsigned int idx, Optimizer *container_handler) {
   optimizer_ = container_handler;
   idx_ = idx;
-  auto nb_genes = optimizer_->nb_nodes_;
-  genes_ = std::vector<char>(nb_genes, 0);
+  evaluation_.session = 0;
+  genes_ = Genome(optimizer_->nb_nodes_);
   //days_alive_ = 0;
   SampleNewGenes();
   container_handler->Fitness(*this);
 }
 
-Individual::Individual(unsigned int idx, Individual &father,
-                       Individual &mother, float crossover_rate,
+Individual::Individual(unsigned int idx, const Individual &father,
+                       const Individual &mother, float crossover_rate,
                        Optimizer *container_handler) { 
   optimizer_ = container_handler;
   std::uniform_real_distribution<float> distribution(0.0, 1.0);
-  if (distribution(generator_) > crossover_rate) {
+  auto &generator = optimizer_->IndividualGenerator();
+  if (distribution(generator) > crossover_rate) {
     // copy father
     idx_ = father.idx_;
-    genes_ = father.GetGenes();
+    genes_ = father.genes_;
     //days_alive_ = 1;
     fitness_ = father.GetFitness();
+    evaluation_ = father.evaluation_;
   } else {
     idx_ = idx;
-    auto nb_genes = optimizer_->nb_nodes_;
-    genes_ = std::vector<char>(nb_genes, 0);
+    evaluation_.session = 0;
     //ndays_alive_ = 0;
 
     // gets half of genes from father and half from mother (probability = 0.5)
+    genes_ = Genome(father.genes_.size());
+    const auto &father_genes = father.genes_;
     for (unsigned int idx = 0; idx < genes_.size(); idx++)
-      if (distribution(generator_) > 0.5)
-        genes_[idx] = father.GetGenes()[idx];
+      if (distribution(generator) > 0.5)
+        genes_.Set(idx, father_genes[idx]);
       else
-        genes_[idx] = father.GetGenes()[idx];
+        genes_.Set(idx, father_genes[idx]);
 
     // mutate genes (logical flip) with probability 1/genes_.size()
-    for (auto &gene: genes_)
-      if (distribution(generator_) < float(1/float(genes_.size())))
-        gene = (gene == 0) ? 1 : 0;
+    Genome mutations(genes_.size());
+    for (unsigned int idx = 0; idx < genes_.size(); idx++)
+      if (distribution(generator) < float(1/float(genes_.size())))
+        mutations.Flip(idx);
+    genes_ ^= mutations;
     //UpdateFitness();
     container_handler->Fitness(*this);
   }
@@ -80,13 +84,15 @@ Individual::~Individual() {
 void
 Individual::SampleNewGenes() {
   std::uniform_real_distribution<float> distribution(0.0, 1.0);
+  auto &generator = optimizer_->IndividualGenerator();
   for (unsigned int idx = 0; idx < genes_.size(); idx++) {
-    float random = distribution(generator_);
+    float random = distribution(generator);
     if (optimizer_->energies_[idx] == 0.0)
-      genes_[idx] = 0;
+      genes_.Set(idx, 0);
     else
-      genes_[idx] = (random < 0.5) ? 1 : 0;
+      genes_.Set(idx, (random < 0.5) ? 1 : 0);
   }
+  evaluation_.session = 0;
   //UpdateFitness();
 }
 
@@ -101,14 +107,27 @@ Individual::SetFitness(fitness_t value) {
   fitness_ = value;
 }
 
-std::vector<char>
-Individual::GetGenes() {
+const Genome &
+Individual::GetGenes() const {
   return genes_;
 }
 
 void
-Individual::SetGenes(std::vector<char> value) {
-  genes_ = value;
+Individual::SetGenes(const Genome &value) {
+  // only the genes that changed are evaluated again
+  Genome changed = value;
+  changed ^= genes_;
+  FlipGenes(changed);
+}
+
+void
+Individual::FlipGenes(const Genome &mask) {
+  if (optimizer_->IsEvaluated(*this))
+    mask.ForEachSet([this](unsigned int idx) {
+      optimizer_->FlipGene(*this, idx);
+    });
+  else
+    genes_ ^= mask;
   optimizer_->Fitness(*this);
 }
 
@@ -4,24 +4,31 @@
 #include <vector>
 #include <random>
 #include "types.h"
+#include "genome.h"
 
 class Optimizer;
 
 class Individual {
+  friend class Optimizer;
+
   public:
     Individual();
     Individual(unsigned int idx, Optimizer *container_handler);
     // copy constructor
     //Individual(const Individual &individual);
-    Individual(unsigned int idx, Individual &father,
-               Individual &mother, float crossover_rate,
+    Individual(unsigned int idx, const Individual &father,
+               const Individual &mother, float crossover_rate,
                Optimizer *container_handler);
     ~Individual();
 
     fitness_t GetFitness() const;
     void SetFitness(fitness_t value);
-    std::vector<char> GetGenes();
-    void SetGenes(std::vector<char> value);
+    // genes are returned by reference (no copy); use SetGenes/FlipGenes
+    // to change them, so the fitness is kept up to date
+    const Genome &GetGenes() const;
+    void SetGenes(const Genome &value);
+    // flips the genes set in mask and updates the fitness
+    void FlipGenes(const Genome &mask);
     //static void SetNewRun();
     //static std::vector<char> GetBestGenes();
     //static fitness_t GetBestFitness();
@@ -34,6 +41,8 @@ class Individual {
     float crowd_dist_;
 
     fitness_t fitness_;
+    // partial sums used to update the fitness when few genes change
+    evaluation_t evaluation_;
 
     // best fitness and genes in family lineage
     //fitness_t best_fitness_;
@@ -44,12 +53,11 @@ class Individual {
     //static std::vector<char> best_global_genes_;
 
   private:
-    std::vector<char> genes_;
-
-    // All individuals share a handler to optimizer
-    static Optimizer *optimizer_;
+    Genome genes_;
 
-    static std::default_random_engine generator_;
+    // handler to the optimizer that holds the individual (random numbers
+    // come from the optimizer, see Optimizer::IndividualGenerator)
+    Optimizer *optimizer_;
 
     //fitness_t UpdateFitness();
     void SampleNewGenes();
@@ -22,7 +22,7 @@ class ModifiedPso: public Optimizer {
     // Mutate and Crossover functions modify the first argument since it is a
     // reference. This is not the best practice but it is done for performance
     // reasons.
-    void Mutate(Individual &individual, std::vector<u_int> can_sleep, 
+    void Mutate(Individual &individual, const std::vector<u_int> &can_sleep,
                   float mutation_rate);
     // Returns an individual that gets statistically half of its genes
     // from individual1 and half from individual2
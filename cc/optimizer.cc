@@ -3,6 +3,12 @@
 
 using namespace std;
 
+// random stream of the task being run by this thread (see ParallelFor)
+static thread_local default_random_engine *task_generator = NULL;
+// candidates still to be drawn (see SampleGenes), reused by the tasks run
+// by this thread
+static thread_local vector<u_int> sample_scratch;
+
 // public methods
 
 Optimizer::Optimizer(dict_t exclusive, regions_t overlapping,
@@ -14,24 +20,39 @@ Optimizer::Optimizer(dict_t exclusive, regions_t overlapping,
   // config.first are all integers
   nb_individuals_ = config.first["NB_INDIVIDUALS"];
   max_iterations_ = config.first["MAX_ITERATIONS"];
+  warm_start_     = config.first["WARM_START"];
+  stagnation_window_ = config.first["STAGNATION_WINDOW"];
+  nb_threads_     = config.first["NB_THREADS"];
+  u_int seed      = config.first["SEED"];
   // config.second are all floats
   fitness_alpha_  = config.second["FITNESS_ALPHA"];
   fitness_beta_   = config.second["FITNESS_BETA"];
   fitness_gamma_  = config.second["FITNESS_GAMMA"];
   wmax_           = config.second["WMAX"];
   wmin_           = config.second["WMIN"];
+  min_improvement_ = config.second["MIN_IMPROVEMENT"];
+  time_budget_     = config.second["TIME_BUDGET"];
   
   nb_nodes_       = ids.size();
+  pool_ = (nb_threads_ > 1) ? new ThreadPool(nb_threads_) : NULL;
+
+  // generators are seeded explicitly, so results do not depend on the
+  // optimizers created before; the seed sequence keeps the individuals'
+  // generator apart from generator_
+  generator_.seed(seed);
+  std::seed_seq individual_seeds{seed};
+  individual_generator_.seed(individual_seeds);
 }
 
 Optimizer::~Optimizer() {
+  delete pool_;
   delete regions_;
 }
 
 individual_t
 Optimizer::Run(vector<float> energies) {
   ClearLearningTraces();
-  InitializeSessionData(energies);
+  InitializeSessionData(std::move(energies));
 
   // depleted nodes should not be taken into consideration
   vector<u_int> can_sleep;
@@ -41,7 +62,8 @@ Optimizer::Run(vector<float> energies) {
 
   CreatePopulation();
   Optimize(can_sleep);
-  return best_global_.GetGenes();
+  FinalizeSessionData();
+  return best_global_.GetGenes().Unpack();
 }
 
 void
@@ -53,6 +75,10 @@ Optimizer::CreatePopulation() {
   population_.clear();
   best_locals_.clear();
   population_.push_back(Individual(0, this));
+  // energies changed little since the previous session, so its best genes
+  // are a good starting point
+  if (warm_start_ && previous_best_.size() == nb_nodes_)
+    population_[0].SetGenes(previous_best_);
   best_global_ = population_[0];
   best_locals_.push_back(population_[0]);
   for (unsigned int idx = 1; idx < nb_individuals_; idx++) {
@@ -62,9 +88,9 @@ Optimizer::CreatePopulation() {
 }
 
 void
-Optimizer::PrintIndividual(individual_t individual) {
-  for (auto const &gene: individual) {
-    printf("%d", gene);
+Optimizer::PrintIndividual(const Genome &genes) {
+  for (u_int idx = 0; idx < genes.size(); idx++) {
+    printf("%d", genes[idx]);
   }
   printf("\n");
 }
@@ -125,20 +151,54 @@ Optimizer::ClearLearningTraces() {
 }
 
 void 
-Optimizer::InitializeSessionData(const float_v &energies) {
-  energies_ = energies;
+Optimizer::InitializeSessionData(float_v energies) {
+  // sums calculated in previous sessions are outdated
+  session_++;
+  session_start_ = std::chrono::steady_clock::now();
+  // random streams are derived again from generator_
+  streams_.clear();
+  energies_ = std::move(energies);
   total_energy_ = 0.0;
   nb_alive_nodes_ = 0;
+  alive_ = Genome(nb_nodes_);
   for (u_int idx = 0; idx < nb_nodes_; idx++) {
     total_energy_ += energies_[idx];
-    if (energies_[idx] == 0.0)
+    if (energies_[idx] == 0.0) {
       dead_nodes_.push_back(ids_[idx]);
-    else
+    } else {
       nb_alive_nodes_++;
+      alive_.Set(idx, 1);
+    }
   }
   regions_->InitSession(energies_);
 }
 
+void
+Optimizer::FinalizeSessionData() {
+  previous_best_ = best_global_.GetGenes();
+}
+
+bool
+Optimizer::ShouldStop() {
+  // the trace holds the best fitness at the start of every iteration done;
+  // at least one iteration is always done
+  u_int nb_iterations = learning_trace_.size();
+  if (nb_iterations == 0)
+    return false;
+
+  if (time_budget_ > 0.0) {
+    std::chrono::duration<float> elapsed =
+      std::chrono::steady_clock::now() - session_start_;
+    if (elapsed.count() >= time_budget_)
+      return true;
+  }
+
+  if (stagnation_window_ == 0 || nb_iterations < stagnation_window_)
+    return false;
+  float window_start = learning_trace_[nb_iterations-stagnation_window_];
+  return best_global_.GetFitness().total <= window_start + min_improvement_;
+}
+
 void
 Optimizer::PushIntoLearningTraces(const fitness_t &fitness) {
   learning_trace_.push_back(fitness.total);
@@ -146,3 +206,110 @@ Optimizer::PushIntoLearningTraces(const fitness_t &fitness) {
   term2_trace_.push_back(fitness.term2);
 }
 
+
+bool
+Optimizer::IsEvaluated(const Individual &individual) {
+  return individual.evaluation_.session == session_;
+}
+
+void
+Optimizer::FlipGene(Individual &individual, u_int idx) {
+  individual.genes_.Flip(idx);
+  char gene = individual.genes_[idx];
+  auto &evaluation = individual.evaluation_;
+  if (energies_[idx] != 0.0) {
+    if (gene == 0) {
+      evaluation.partial_energy += energies_[idx];
+      evaluation.nb_active_nodes++;
+    } else {
+      evaluation.partial_energy -= energies_[idx];
+      evaluation.nb_active_nodes--;
+    }
+  }
+  regions_->FlipGene(idx, gene, energies_, evaluation);
+}
+
+coverage_info_t
+Optimizer::Evaluate(Individual &individual) {
+  auto &evaluation = individual.evaluation_;
+  if (!IsEvaluated(individual)) {
+    const auto &genes = individual.genes_;
+    // active nodes: alive and not sleeping
+    Genome active = genes;
+    active ^= alive_;
+    active &= alive_;
+    evaluation.nb_active_nodes = active.Count();
+    evaluation.partial_energy = 0.0;
+    active.ForEachSet([&](u_int idx) {
+      evaluation.partial_energy += energies_[idx];
+    });
+    regions_->InitEvaluation(genes, energies_, evaluation);
+    evaluation.session = session_;
+  }
+  return regions_->GetCoverage(evaluation);
+}
+
+void
+Optimizer::ParallelFor(u_int count, const task_t &task) {
+  if (!IsParallel()) {
+    for (u_int idx = 0; idx < count; idx++)
+      task(idx);
+    return;
+  }
+
+  // one stream per task index, so results do not depend on which thread
+  // runs which task
+  if (streams_.empty())
+    streams_seed_ = generator_();
+  while (streams_.size() < count)
+    streams_.push_back(TaskStream(streams_seed_, streams_.size()));
+
+  in_batch_ = true;
+  pool_->Run(count, [this, &task](u_int idx) {
+    task_generator = &streams_[idx];
+    task(idx);
+    task_generator = NULL;
+  });
+  in_batch_ = false;
+}
+
+default_random_engine &
+Optimizer::Generator() {
+  return (task_generator != NULL) ? *task_generator : generator_;
+}
+
+default_random_engine &
+Optimizer::IndividualGenerator() {
+  return (task_generator != NULL) ? *task_generator : individual_generator_;
+}
+
+void
+Optimizer::SampleGenes(const vector<u_int> &candidates, u_int nb_samples,
+                       Genome &samples) {
+  // partial Fisher-Yates: a drawn candidate is swapped with the last one
+  // still to be drawn, so each draw takes constant time
+  auto &scratch = sample_scratch;
+  scratch.assign(candidates.begin(), candidates.end());
+  nb_samples = min(nb_samples, u_int(scratch.size()));
+  for (u_int count = 0; count < nb_samples; count++) {
+    u_int last = scratch.size()-1-count;
+    uniform_int_distribution<int> distribution(0, last);
+    u_int drawn = distribution(Generator());
+    samples.Set(scratch[drawn], 1);
+    swap(scratch[drawn], scratch[last]);
+  }
+}
+
+void
+Optimizer::UpdateBestGlobal(const Individual &individual) {
+  if (in_batch_)
+    return;
+  if (individual.GetFitness().total > best_global_.GetFitness().total)
+    best_global_ = individual;
+}
+
+void
+Optimizer::UpdateBestGlobal(const vector<Individual> &individuals) {
+  for (auto const &individual: individuals)
+    UpdateBestGlobal(individual);
+}
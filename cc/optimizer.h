@@ -4,6 +4,7 @@
 #ifndef OPTIMIZER_H
 #define OPTIMIZER_H
 
+#include <chrono>
 #include <map>
 #include <string>
 #include <utility>
@@ -12,6 +13,7 @@
 #include "types.h"
 #include "regions.h"
 #include "individual.h"
+#include "thread_pool.h"
 
 // most of these definitions are used to improve readability
 typedef unsigned int u_int;
@@ -22,10 +24,22 @@ typedef std::pair<std::vector<u_int>,
                   float> region_t;
 typedef std::vector<region_t> regions_t;
 typedef std::map<u_int, float> dict_t;
-// using char for the smallest addressable unit
-typedef std::vector<char> individual_t;
+// one gene per byte (1: sleeping, 0: active)
+typedef std::vector<unsigned char> individual_t;
 typedef std::pair<std::map<std::string, u_int>, 
                   std::map<std::string, float>> config_t;
+#ifndef SWIG
+typedef std::function<void(u_int)> task_t;
+
+// random stream of task idx. Both values go through a seed sequence, so
+// streams of neighbouring tasks are unrelated (seeding the engine with
+// consecutive outputs of another one would only shift its sequence; see
+// tests/check_streams.cc)
+inline std::default_random_engine TaskStream(unsigned int seed, u_int idx) {
+  std::seed_seq seeds{seed, idx};
+  return std::default_random_engine(seeds);
+}
+#endif
 
 
 class Optimizer {
@@ -48,6 +62,8 @@ class Optimizer {
     void SetAlpha(float value);
     void SetBeta(float value);
     void SetGamma(float value);
+    // traces have one value per iteration done in the last run (sessions
+    // may stop before max_iterations_, see ShouldStop)
     std::vector<float> GetLearningTrace();
     std::vector<float> GetTerm1Trace();
     std::vector<float> GetTerm2Trace();
@@ -62,6 +78,14 @@ class Optimizer {
     u_int nb_nodes_;
     u_int nb_individuals_;
     u_int max_iterations_;
+    // sessions start from the best genes of the previous session
+    bool warm_start_;
+    // iterations without an improvement greater than min_improvement_ after
+    // which a session stops (0: never)
+    u_int stagnation_window_;
+    float min_improvement_;
+    // maximum duration of a session in seconds (0: no limit)
+    float time_budget_;
     float wmax_;
     float wmin_;
 
@@ -69,6 +93,16 @@ class Optimizer {
     float fitness_beta_;
     float fitness_gamma_;
 
+    // parallel evaluation (NB_THREADS > 1): individuals of a generation are
+    // evaluated on a thread pool, each with its own random stream
+    u_int nb_threads_;
+    ThreadPool *pool_;
+    std::vector<std::default_random_engine> streams_;
+    // seed of the streams of the session, drawn from generator_
+    unsigned int streams_seed_;
+    // true while a parallel batch runs (best_global_ is updated after it)
+    bool in_batch_ = false;
+
     // session attributes (stored here for convenience)
 
     // std::vector with all individuals
@@ -78,11 +112,18 @@ class Optimizer {
 
     // random related
     std::default_random_engine generator_;
+    // used by individuals (sampling and crossover)
+    std::default_random_engine individual_generator_;
 
     float_v energies_;
     float total_energy_;
     std::vector<unsigned int> dead_nodes_;
     unsigned int nb_alive_nodes_;
+    // alive nodes of the session, with the same layout as the genes
+    Genome alive_;
+    std::chrono::steady_clock::time_point session_start_;
+    // best genes found in the previous session (see warm_start_)
+    Genome previous_best_;
 
     // learning traces for the last run
     std::vector<float> learning_trace_;
@@ -90,16 +131,43 @@ class Optimizer {
     std::vector<float> term2_trace_;
 
     // methods
-    void PrintIndividual(individual_t individual);
+    void PrintIndividual(const Genome &genes);
 
     void CreatePopulation();
     virtual void Optimize(const std::vector<u_int> &can_sleep);
 
     void ClearLearningTraces();
-    void InitializeSessionData(const float_v &energies);
+    void InitializeSessionData(float_v energies);
+    void FinalizeSessionData();
+    // true if the session should stop before the next iteration
+    bool ShouldStop();
 
     void PushIntoLearningTraces(const fitness_t &fitness);
 
+    // delta evaluation: the energy and coverage sums of each individual
+    // are calculated once per session, then updated gene by gene
+    unsigned int session_ = 0;
+    bool IsEvaluated(const Individual &individual);
+    void FlipGene(Individual &individual, u_int idx);
+    // returns the coverage of individual and updates its sums if needed
+    coverage_info_t Evaluate(Individual &individual);
+
+    // calls task(idx) for every idx < count, on the thread pool if there is
+    // one; tasks must only change the individual they work on
+    void ParallelFor(u_int count, const task_t &task);
+    bool IsParallel() const { return pool_ != NULL; }
+    // random generators, replaced by the stream of the task in parallel
+    std::default_random_engine &Generator();
+    std::default_random_engine &IndividualGenerator();
+    // sets in samples nb_samples distinct genes drawn from candidates, in
+    // O(candidates) time
+    void SampleGenes(const std::vector<u_int> &candidates, u_int nb_samples,
+                     Genome &samples);
+    // replaces best_global_ if individual(s) are fitter; done after the
+    // batch in parallel
+    void UpdateBestGlobal(const Individual &individual);
+    void UpdateBestGlobal(const std::vector<Individual> &individuals);
+
     // Returns a float indicating how fit a individual/particle is,
     // and the coverage and overlapping areas for that particle.
     virtual fitness_t Fitness(Individual &individual) = 0;
@@ -8,13 +8,15 @@
   #include "optimizer.h"
 %}
 
+%pythonbegin %{
+import numpy
+%}
+
 %template(vector0)      std::vector<int>;
 %template(regions_t)    std::vector<std::pair<std::vector<unsigned int>,
                                               float>>;
-%template(individual_t) std::vector<char>;
 %template(float_v)      std::vector<float>;
 %template(vector1)      std::vector<unsigned int>;
-%template(vector2)      std::vector<std::vector<char>>;
 %template(dict_t)       std::map<unsigned int, float>;
 %template(map0)         std::map<std::string, unsigned int>;
 %template(map1)         std::map<std::string, float>;
@@ -23,4 +25,55 @@
 %template(region_t)     std::pair<std::vector<unsigned int>,
                                   float>;
 
+// energies: a contiguous float32 buffer (e.g. a NumPy array) is copied at
+// once into the session data; other sequences are converted element by
+// element
+%typemap(in) std::vector<float> energies {
+  bool is_float = false;
+  Py_buffer view;
+  if (PyObject_CheckBuffer($input) &&
+      PyObject_GetBuffer($input, &view, PyBUF_FORMAT|PyBUF_C_CONTIGUOUS) == 0) {
+    const char *format = view.format ? view.format : "B";
+    if (format[0] == '<' || format[0] == '=' || format[0] == '@')
+      format++;
+    is_float = view.ndim <= 1 && view.itemsize == sizeof(float) &&
+               format[0] == 'f' && format[1] == '\0';
+    if (is_float) {
+      const float *data = static_cast<const float *>(view.buf);
+      $1.assign(data, data + view.len/sizeof(float));
+    }
+    PyBuffer_Release(&view);
+  }
+  if (!is_float) {
+    PyErr_Clear();
+    PyObject *sequence = PySequence_Fast($input, "energies must be a sequence");
+    if (!sequence)
+      SWIG_fail;
+    Py_ssize_t size = PySequence_Fast_GET_SIZE(sequence);
+    $1.reserve(size);
+    for (Py_ssize_t idx = 0; idx < size; idx++)
+      $1.push_back(PyFloat_AsDouble(PySequence_Fast_GET_ITEM(sequence, idx)));
+    Py_DECREF(sequence);
+    if (PyErr_Occurred())
+      SWIG_fail;
+  }
+}
+
+// genes are returned as a NumPy uint8 array (1: sleeping, 0: active) that
+// shares its memory with a bytearray
+%typemap(out) individual_t {
+  $result = PyByteArray_FromStringAndSize(
+              reinterpret_cast<const char *>($1.data()), $1.size());
+}
+%pythonappend Run %{
+  val = numpy.frombuffer(val, dtype=numpy.uint8)
+%}
+
+// Run only works on C++ data, so other Python threads may run meanwhile
+%exception Run {
+  Py_BEGIN_ALLOW_THREADS
+  $action
+  Py_END_ALLOW_THREADS
+}
+
 %include "optimizer.h"
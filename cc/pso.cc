@@ -13,7 +13,6 @@ Pso::~Pso() {
 
 void
 Pso::Optimize(const vector<u_int> &can_sleep) {
-  uniform_real_distribution<float> distribution(0.0, 1.0);
   uniform_real_distribution<float> distribution2(-0.5, 0.5);
 
   // initialize velocity_
@@ -25,46 +24,47 @@ Pso::Optimize(const vector<u_int> &can_sleep) {
 
   float acceleration = 1.0, phi1 = 2.0, phi2 = 2.0;
   for (u_int it = 0; it < max_iterations_; it++) {
+    if (ShouldStop())
+      break;
     PushIntoLearningTraces(best_global_.GetFitness());
-    for (u_int individual_idx = 0; individual_idx < nb_individuals_; individual_idx++) {
+    ParallelFor(nb_individuals_, [&](u_int individual_idx) {
+      uniform_real_distribution<float> distribution(0.0, 1.0);
+      auto &generator = Generator();
       Individual &individual = population_[individual_idx];
       Individual &best_local = best_locals_[individual_idx];
-      auto genes = individual.GetGenes();
-      
+      Genome genes = individual.GetGenes();
+      const auto &global_genes = best_global_.GetGenes();
+      const auto &local_genes  = best_local.GetGenes();
+
       for(auto const &idx: can_sleep) {
-        float r1 = distribution(generator_);
-        float r2 = distribution(generator_);
-        float r3 = distribution(generator_);
+        float r1 = distribution(generator);
+        float r2 = distribution(generator);
+        float r3 = distribution(generator);
 
-        int diff_to_global = best_global_.GetGenes()[idx] - genes[idx];
-        int diff_to_local  = best_local.GetGenes()[idx] - genes[idx];
+        int diff_to_global = global_genes[idx] - genes[idx];
+        int diff_to_local  = local_genes[idx] - genes[idx];
         velocity_[individual_idx][idx] = acceleration*velocity_[individual_idx][idx] +
                                          phi1*r1*diff_to_global + 
                                          phi2*r2*diff_to_local;
 
         float velocity_norm = 1 / (1 + exp(-velocity_[individual_idx][idx]));
         
-        genes[idx] = (r3 < velocity_norm) ? 1 : 0;
+        genes.Set(idx, (r3 < velocity_norm) ? 1 : 0);
       }
       individual.SetGenes(genes);
       if (individual.GetFitness().total > best_local.GetFitness().total)
         best_local = individual;
-    }
+    });
+    // in parallel, particles move towards the best of the last iteration
+    UpdateBestGlobal(population_);
   }
 }
 
 fitness_t
 Pso::Fitness(Individual &individual) {
-  float partial_energy = 0.0;
-  u_int nb_active_nodes = 0;
-  auto genes = individual.GetGenes();
-  for (u_int idx = 0; idx < nb_nodes_; idx++)
-    if (genes[idx] == 0 && energies_[idx] != 0.0) { // active nodes
-      partial_energy += energies_[idx];
-      nb_active_nodes++;
-    }
-
-  auto coverage_info = regions_->GetCoverage(genes, energies_);
+  auto coverage_info = Evaluate(individual);
+  float partial_energy  = individual.evaluation_.partial_energy;
+  u_int nb_active_nodes = individual.evaluation_.nb_active_nodes;
 
   float term1 = 0.0, term2 = 0.0, term3 = 0.0;
   if (total_energy_ != 0.0)
@@ -87,8 +87,7 @@ Pso::Fitness(Individual &individual) {
 
   individual.SetFitness(fitness_ret);
 
-  if (fitness_ret.total > best_global_.GetFitness().total)
-    best_global_ = individual;
+  UpdateBestGlobal(individual);
 
   return fitness_ret;
 }
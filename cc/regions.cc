@@ -1,15 +1,36 @@
 #include "regions.h"
 #include <stdio.h>
+#include <algorithm>
 
 using namespace std;
 
-Regions::Regions(map<u_int, float> exclusive, vector<region_t> overlapping)
-        : exclusive_(exclusive),
-          overlapping_(overlapping) {
-  // traverses the exclusive regions
-  total_coverage_exclusive_ = 0.0;
-  for (auto const &region: exclusive_) 
-    total_coverage_exclusive_ += region.second;
+Regions::Regions(map<u_int, float> exclusive, vector<region_t> overlapping) {
+  // dense arrays are indexed by node, up to the highest node found
+  u_int nb_nodes = 0;
+  for (auto const &region: exclusive)
+    nb_nodes = max(nb_nodes, region.first+1);
+  for (auto const &region: overlapping)
+    for (auto const &owner: region.first)
+      nb_nodes = max(nb_nodes, owner+1);
+
+  initial_exclusive_ = vector<float>(nb_nodes, 0.0);
+  for (auto const &region: exclusive)
+    initial_exclusive_[region.first] = region.second;
+
+  initial_overlapping_.offsets.push_back(0);
+  for (auto const &region: overlapping) {
+    initial_overlapping_.owners.insert(initial_overlapping_.owners.end(),
+                                       region.first.begin(),
+                                       region.first.end());
+    initial_overlapping_.offsets.push_back(initial_overlapping_.owners.size());
+    initial_overlapping_.areas.push_back(region.second);
+  }
+
+  exclusive_   = initial_exclusive_;
+  overlapping_ = initial_overlapping_;
+  inherited_   = vector<float>(nb_nodes, 0.0);
+  UpdateTotalCoverageExclusive();
+  IndexOwners();
 }
 
 Regions::~Regions() {
@@ -19,43 +40,49 @@ Regions::~Regions() {
 // the partial coverage (considering that inactive_nodes are inactive),
 // the total and partial overlapping areas.
 coverage_info_t
-Regions::GetCoverage(const vector<char> &individual,
+Regions::GetCoverage(const Genome &individual,
                      const vector<float> &energies) {
   float partial_overlapping = 0.0; 
 
   float partial_coverage = total_coverage_;
+  float active_inherited = 0.0, inactive_inherited = 0.0;
 
   // remove from partial inactive_nodes
-  for (unsigned int idx=0; idx<individual.size(); idx++)
-    if (individual[idx] == 1 && energies[idx] != 0.0)
-      partial_coverage -= exclusive_[idx];
+  u_int nb_nodes = min(individual.size(), exclusive_.size());
+  for (u_int idx=0; idx<nb_nodes; idx++)
+    if (individual[idx] == 1 && energies[idx] != 0.0) {
+      partial_coverage   -= exclusive_[idx];
+      inactive_inherited += inherited_[idx];
+    } else if (individual[idx] == 0 && energies[idx] != 0.0) {
+      active_inherited   += inherited_[idx];
+    }
 
   if (partial_coverage < 0.0)
     partial_coverage = 0.0;
 
-  float exclusive_area = partial_coverage;
+  float exclusive_area = partial_coverage + active_inherited;
+  partial_coverage -= inactive_inherited;
 
-  // traverses the overlapping regions
-  for (auto const &region: overlapping_) {
-    bool all_sleeping = true;
-    bool all_depleted = true;
+  // traverses the overlapping regions (their owners are all alive)
+  const u_int *offsets = overlapping_.offsets.data();
+  const u_int *owners  = overlapping_.owners.data();
+  const float *areas   = overlapping_.areas.data();
+  u_int nb_regions = overlapping_.areas.size();
+  for (u_int region = 0; region < nb_regions; region++) {
     short int nb_remaining_owners = 0;
-    for (auto const &owner: region.first) {
-      if (individual[owner] == 0 && energies[owner] != 0.0) {// active && alive
+    for (u_int idx = offsets[region]; idx < offsets[region+1]; idx++) {
+      if (individual[owners[idx]] == 0) {// active
         nb_remaining_owners++;
-        all_sleeping = false;
         if (nb_remaining_owners > 1)
           break;
       }
-      if (energies[owner] != 0.0)
-        all_depleted = false;
     }
    
-    if (all_sleeping && !all_depleted)
-      partial_coverage -= region.second;
+    if (nb_remaining_owners == 0)
+      partial_coverage -= areas[region];
 
     if (nb_remaining_owners == 1)
-      exclusive_area += region.second;
+      exclusive_area += areas[region];
   }
 
   //printf("partial coverage: %f\n", partial_coverage);
@@ -72,34 +99,206 @@ Regions::GetCoverage(const vector<char> &individual,
   return coverage_info;
 }
 
+void
+Regions::InitEvaluation(const Genome &individual,
+                        const vector<float> &energies,
+                        evaluation_t &evaluation) {
+  evaluation.inactive_exclusive = 0.0;
+  evaluation.active_inherited   = 0.0;
+  evaluation.inactive_inherited = 0.0;
+  u_int nb_nodes = min(individual.size(), exclusive_.size());
+  for (u_int idx=0; idx<nb_nodes; idx++)
+    if (individual[idx] == 1 && energies[idx] != 0.0) {
+      evaluation.inactive_exclusive += exclusive_[idx];
+      evaluation.inactive_inherited += inherited_[idx];
+    } else if (individual[idx] == 0 && energies[idx] != 0.0) {
+      evaluation.active_inherited   += inherited_[idx];
+    }
+
+  evaluation.uncovered    = 0.0;
+  evaluation.single_owner = 0.0;
+  u_int nb_regions = overlapping_.areas.size();
+  evaluation.nb_active_owners.assign(nb_regions, 0);
+  for (u_int region = 0; region < nb_regions; region++) {
+    unsigned short nb_active_owners = 0;
+    for (u_int idx = overlapping_.offsets[region];
+         idx < overlapping_.offsets[region+1]; idx++)
+      if (individual[overlapping_.owners[idx]] == 0)
+        nb_active_owners++;
+    evaluation.nb_active_owners[region] = nb_active_owners;
+    if (nb_active_owners == 0)
+      evaluation.uncovered += overlapping_.areas[region];
+    else if (nb_active_owners == 1)
+      evaluation.single_owner += overlapping_.areas[region];
+  }
+}
+
+void
+Regions::FlipGene(u_int idx, char gene, const vector<float> &energies,
+                  evaluation_t &evaluation) {
+  // dead nodes do not own regions anymore
+  if (idx >= exclusive_.size() || energies[idx] == 0.0)
+    return;
+
+  if (gene == 1) { // goes to sleep
+    evaluation.inactive_exclusive += exclusive_[idx];
+    evaluation.active_inherited   -= inherited_[idx];
+    evaluation.inactive_inherited += inherited_[idx];
+    for (u_int pos = node_offsets_[idx]; pos < node_offsets_[idx+1]; pos++) {
+      u_int region = node_regions_[pos];
+      float area = overlapping_.areas[region];
+      unsigned short nb_active_owners = --evaluation.nb_active_owners[region];
+      if (nb_active_owners == 1) {
+        evaluation.single_owner += area;
+      } else if (nb_active_owners == 0) {
+        evaluation.single_owner -= area;
+        evaluation.uncovered    += area;
+      }
+    }
+  } else { // wakes up
+    evaluation.inactive_exclusive -= exclusive_[idx];
+    evaluation.active_inherited   += inherited_[idx];
+    evaluation.inactive_inherited -= inherited_[idx];
+    for (u_int pos = node_offsets_[idx]; pos < node_offsets_[idx+1]; pos++) {
+      u_int region = node_regions_[pos];
+      float area = overlapping_.areas[region];
+      unsigned short nb_active_owners = ++evaluation.nb_active_owners[region];
+      if (nb_active_owners == 1) {
+        evaluation.uncovered    -= area;
+        evaluation.single_owner += area;
+      } else if (nb_active_owners == 2) {
+        evaluation.single_owner -= area;
+      }
+    }
+  }
+}
+
+// Same as GetCoverage(individual, energies), from the sums of an evaluation
+coverage_info_t
+Regions::GetCoverage(const evaluation_t &evaluation) {
+  float partial_coverage = total_coverage_ - evaluation.inactive_exclusive;
+  if (partial_coverage < 0.0)
+    partial_coverage = 0.0;
+
+  coverage_info_t coverage_info;
+  coverage_info.exclusive_area      = partial_coverage +
+                                      evaluation.active_inherited +
+                                      evaluation.single_owner;
+  coverage_info.partial_coverage    = partial_coverage -
+                                      evaluation.inactive_inherited -
+                                      evaluation.uncovered;
+  coverage_info.total_coverage      = total_coverage_;
+  coverage_info.partial_overlapping = 0.0;
+  coverage_info.total_overlapping   = total_overlapping_;
+  return coverage_info;
+}
+
 void
 Regions::InitSession(const std::vector<float> &energies) {
+  RemoveDeadNodes(energies);
+
+  // dead nodes were already excluded
   total_coverage_ = total_coverage_exclusive_;
 
-  // excludes dead nodes
   bool all_dead = true;
   for (unsigned int idx=0; idx<energies.size(); idx++)
-    if (energies[idx] == 0.0)
-      total_coverage_ -= exclusive_[idx];
-    else
+    if (energies[idx] != 0.0)
       all_dead = false;
 
+  total_overlapping_ = 0.0;
+  for (auto const &area: overlapping_.areas)
+    total_coverage_ += area;
+
   // avoids approximation errors
   if (all_dead)
     total_coverage_ = 0.0;
+}
 
-  total_overlapping_ = 0.0;
-  for (auto const &region: overlapping_) {
-    for (auto const &owner: region.first)
-      if (energies[owner] != 0.0) {
-        total_coverage_ += region.second;
-        break;
+void
+Regions::RemoveDeadNodes(const std::vector<float> &energies) {
+  // a dead node that comes back (e.g. recharged) invalidates the regions
+  bool revived = dead_.size() != energies.size();
+  for (unsigned int idx=0; idx<dead_.size() && !revived; idx++)
+    if (dead_[idx] && energies[idx] != 0.0)
+      revived = true;
+
+  if (revived) {
+    exclusive_   = initial_exclusive_;
+    overlapping_ = initial_overlapping_;
+    inherited_.assign(inherited_.size(), 0.0);
+    dead_.assign(energies.size(), false);
+  }
+
+  bool someone_died = false;
+  for (unsigned int idx=0; idx<energies.size(); idx++)
+    if (!dead_[idx] && energies[idx] == 0.0) {
+      dead_[idx] = true;
+      if (idx < exclusive_.size()) {
+        exclusive_[idx] = 0.0;
+        inherited_[idx] = 0.0;
       }
+      someone_died = true;
+    }
+
+  if (someone_died) {
+    // compacts the regions in place
+    u_int nb_regions = overlapping_.areas.size();
+    u_int region_end = 0, owner_end = 0, start = 0;
+    for (u_int region = 0; region < nb_regions; region++) {
+      // offsets[region+1] may be overwritten below
+      u_int end = overlapping_.offsets[region+1];
+      u_int first_owner = owner_end;
+      for (u_int idx = start; idx < end; idx++) {
+        u_int owner = overlapping_.owners[idx];
+        if (!dead_[owner])
+          overlapping_.owners[owner_end++] = owner;
+      }
+
+      start = end;
+      u_int nb_owners = owner_end - first_owner;
+      if (nb_owners == 1)
+        inherited_[overlapping_.owners[first_owner]] += overlapping_.areas[region];
+      if (nb_owners <= 1) {
+        owner_end = first_owner;
+        continue;
+      }
+      overlapping_.areas[region_end] = overlapping_.areas[region];
+      overlapping_.offsets[++region_end] = owner_end;
+    }
+    overlapping_.owners.resize(owner_end);
+    overlapping_.areas.resize(region_end);
+    overlapping_.offsets.resize(region_end+1);
+  }
 
-    //if (alive_remains == 1) {
-    //} else if (alive_remains > 1) {
-    //  total_overlapping_ += region.second;
-    //}
+  if (someone_died || revived) {
+    UpdateTotalCoverageExclusive();
+    IndexOwners();
   }
 }
 
+void
+Regions::UpdateTotalCoverageExclusive() {
+  total_coverage_exclusive_ = 0.0;
+  for (auto const &area: exclusive_)
+    total_coverage_exclusive_ += area;
+  for (auto const &area: inherited_)
+    total_coverage_exclusive_ += area;
+}
+
+void
+Regions::IndexOwners() {
+  u_int nb_nodes = exclusive_.size();
+  node_offsets_.assign(nb_nodes+1, 0);
+  for (auto const &owner: overlapping_.owners)
+    node_offsets_[owner+1]++;
+  for (u_int idx = 0; idx < nb_nodes; idx++)
+    node_offsets_[idx+1] += node_offsets_[idx];
+
+  node_regions_.resize(overlapping_.owners.size());
+  vector<u_int> next(node_offsets_.begin(), node_offsets_.end()-1);
+  u_int nb_regions = overlapping_.areas.size();
+  for (u_int region = 0; region < nb_regions; region++)
+    for (u_int idx = overlapping_.offsets[region];
+         idx < overlapping_.offsets[region+1]; idx++)
+      node_regions_[next[overlapping_.owners[idx]]++] = region;
+}
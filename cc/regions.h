@@ -8,6 +8,7 @@
 #include <utility>
 #include <vector>
 #include "types.h"
+#include "genome.h"
 
 typedef unsigned int u_int;
 typedef std::pair<std::vector<u_int>,
@@ -19,19 +20,55 @@ class Regions {
             std::vector<region_t> _overlapping);
     ~Regions();
 
-    coverage_info_t GetCoverage(const std::vector<char> &individual,
+    coverage_info_t GetCoverage(const Genome &individual,
                                 const std::vector<float> &energies);
 
+    // delta evaluation: InitEvaluation calculates the coverage sums of an
+    // individual from scratch, FlipGene updates them after gene idx was set
+    // to gene, touching only the regions covered by node idx
+    void InitEvaluation(const Genome &individual,
+                        const std::vector<float> &energies,
+                        evaluation_t &evaluation);
+    void FlipGene(u_int idx, char gene, const std::vector<float> &energies,
+                  evaluation_t &evaluation);
+    coverage_info_t GetCoverage(const evaluation_t &evaluation);
+
     void InitSession(const std::vector<float> &energies);
 
   private:
-    std::map<u_int, float> exclusive_;
-    std::vector<region_t> overlapping_; 
+    // overlapping regions in compressed sparse rows: owners of region r are
+    // owners[offsets[r]] to owners[offsets[r+1]-1], its area is areas[r]
+    typedef struct {
+      std::vector<u_int> offsets;
+      std::vector<u_int> owners;
+      std::vector<float> areas;
+    } packed_regions_t;
+
+    // regions as given to the constructor (used if a dead node comes back)
+    std::vector<float> initial_exclusive_;
+    packed_regions_t initial_overlapping_;
+
+    // regions without dead nodes: dead owners are removed from overlapping
+    // regions, regions left with a single owner are merged into its inhe-
+    // rited area and regions left without owners are dropped
+    // exclusive areas and inherited areas are indexed by node
+    std::vector<float> exclusive_;
+    packed_regions_t overlapping_;
+    // area that became exclusive to a node because its other owners died
+    std::vector<float> inherited_;
+    // nodes already removed from the regions
+    std::vector<bool> dead_;
+    // overlapping regions of each node (same layout as overlapping_)
+    std::vector<u_int> node_offsets_;
+    std::vector<u_int> node_regions_;
 
     float total_coverage_exclusive_ = 0.0;
     // session attributes
     float total_coverage_    = 0.0;
     float total_overlapping_ = 0.0;
 
+    void RemoveDeadNodes(const std::vector<float> &energies);
+    void UpdateTotalCoverageExclusive();
+    void IndexOwners();
 };
 #endif //REGIONS_H
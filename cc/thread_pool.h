@@ -0,0 +1,88 @@
+// Fixed set of threads that run batches of independent tasks (e.g. the
+// fitness evaluation of every individual of a generation).
+
+#ifndef THREAD_POOL_H
+#define THREAD_POOL_H
+
+#include <atomic>
+#include <condition_variable>
+#include <functional>
+#include <mutex>
+#include <thread>
+#include <vector>
+
+class ThreadPool {
+  public:
+    // nb_threads includes the thread that calls Run
+    explicit ThreadPool(unsigned int nb_threads) {
+      for (unsigned int idx = 1; idx < nb_threads; idx++)
+        workers_.push_back(std::thread(&ThreadPool::Work, this));
+    }
+
+    ~ThreadPool() {
+      {
+        std::lock_guard<std::mutex> lock(mutex_);
+        stop_ = true;
+      }
+      start_.notify_all();
+      for (auto &worker: workers_)
+        worker.join();
+    }
+
+    // calls task(idx) for every idx < count, spread over the threads, and
+    // returns once all calls are done
+    void Run(unsigned int count,
+             const std::function<void(unsigned int)> &task) {
+      {
+        std::lock_guard<std::mutex> lock(mutex_);
+        task_ = &task;
+        count_ = count;
+        next_ = 0;
+        nb_busy_ = workers_.size();
+        batch_++;
+      }
+      start_.notify_all();
+      Drain();
+      std::unique_lock<std::mutex> lock(mutex_);
+      done_.wait(lock, [this] { return nb_busy_ == 0; });
+      task_ = NULL;
+    }
+
+  private:
+    std::vector<std::thread> workers_;
+    std::mutex mutex_;
+    std::condition_variable start_;
+    std::condition_variable done_;
+
+    // current batch
+    const std::function<void(unsigned int)> *task_ = NULL;
+    unsigned int count_ = 0;
+    std::atomic<unsigned int> next_{0};
+    unsigned int nb_busy_ = 0;
+    unsigned long batch_ = 0;
+    bool stop_ = false;
+
+    void Work() {
+      unsigned long last_batch = 0;
+      while (true) {
+        {
+          std::unique_lock<std::mutex> lock(mutex_);
+          start_.wait(lock, [&] { return stop_ || batch_ != last_batch; });
+          if (stop_)
+            return;
+          last_batch = batch_;
+        }
+        Drain();
+        std::lock_guard<std::mutex> lock(mutex_);
+        if (--nb_busy_ == 0)
+          done_.notify_one();
+      }
+    }
+
+    // runs tasks of the current batch until there are none left
+    void Drain() {
+      for (unsigned int idx = next_++; idx < count_; idx = next_++)
+        (*task_)(idx);
+    }
+};
+#endif //THREAD_POOL_H
@@ -18,4 +18,24 @@ typedef struct {
 
 typedef std::vector<fitness_t> population_fitness_t;
 
+// partial sums kept by each individual, so flipping a gene only updates
+// the terms that depend on it (see Regions::FlipGene)
+typedef struct {
+  // session in which the sums were calculated (0: not calculated)
+  unsigned int session;
+  // number of active owners of each overlapping region
+  std::vector<unsigned short> nb_active_owners;
+  // exclusive area of sleeping nodes
+  double inactive_exclusive;
+  // inherited area of active and sleeping nodes
+  double active_inherited;
+  double inactive_inherited;
+  // area of overlapping regions with no active owner and with a single one
+  double uncovered;
+  double single_owner;
+  // energy and number of active (alive) nodes
+  double partial_energy;
+  unsigned int nb_active_nodes;
+} evaluation_t;
+
 #endif // TYPES_H
@@ -130,6 +130,13 @@ MAX_TX_PER_ROUND = 1
 
 NOTIFY_POSITION = 0
 
+# two-level communication (ordinary nodes -> heads -> BS) is computed for
+# all nodes at once with array operations, instead of node by node
+BATCHED_COMMUNICATION = 1
+
+# number of worker processes used by run.run_batch (None: one per CPU)
+NB_WORKERS = None
+
 ## Network configurations:
 # number of nodes
 NB_NODES = 300
@@ -169,6 +176,17 @@ THRESHOLD_DIST = math.sqrt(E_FS/E_MP) # meters
 NB_CLUSTERS = 5
 # FCM fuzzyness coeficient
 FUZZY_M = 2
+# FCM starts each clustering from the centroids of the previous one
+FCM_WARM_START = 1
+# MTE calculates all routes with a single Dijkstra run from the base
+# station (instead of one run per node)
+MTE_SINGLE_SOURCE = 1
+# MTE only uses links shorter than TX_RANGE (single source only). Nodes
+# that cannot reach the base station through them transmit directly.
+MTE_HONOR_TX_RANGE = 0
+# when nodes die, MTE only recalculates the routes that went through
+# them (single source only)
+MTE_INCREMENTAL_REPAIR = 1
 
 
 ## Sleep Scheduling configurations:
@@ -181,11 +199,47 @@ FITNESS_BETA   = 0.33
 FITNESS_GAMMA  = 0.33
 WMAX = 0.6
 WMIN = 0.1
+# threads used by the optimizers to evaluate the individuals of a gener-
+# ation (1: sequential). With more than one thread, the global best is
+# only updated after each generation, so results differ from sequential.
+NB_THREADS = 1
+# seed of the optimizers' random generators (every optimizer starts from
+# it, whatever ran before in the same process)
+OPTIMIZER_SEED = 1
+# with WARM_START, each round the optimizer starts from the best configu-
+# ration found in the previous round (energies change little between
+# rounds). A round stops after STAGNATION_WINDOW iterations in which the
+# best fitness did not improve by more than MIN_IMPROVEMENT (0: always
+# runs MAX_ITERATIONS), or after TIME_BUDGET seconds (0: no limit; results
+# then depend on the machine's speed).
+WARM_START = 0
+STAGNATION_WINDOW = 0
+MIN_IMPROVEMENT = 0.0
+TIME_BUDGET = 0.0
+# runs one optimizer per cluster (nodes with the same membership when the
+# round starts) instead of a single one over the whole network. It needs
+# a routing protocol that sets memberships (FCM; with LEACH, MTE or DC no
+# node is ever scheduled). Nodes without a cluster (e.g. in the first
+# round) are not scheduled. Clusters are scheduled concurrently by
+# NB_SCHEDULING_THREADS threads (None: NB_CLUSTERS threads).
+SLEEP_SCHEDULING_PER_CLUSTER = 0
+NB_SCHEDULING_THREADS = None
 
 
 ## Other configurations:
+# how coverage regions are calculated:
+#   'grid'    : pixel grid with GRID_PRECISION
+#   'quadtree': adaptive quadtree, refined only along disk boundaries
+#               down to QUADTREE_PRECISION (much more accurate)
+COVERAGE_MODEL = 'grid'
 # grid precision (the bigger the faster the simulation)
 GRID_PRECISION = 1 # in meters
+# size of the smallest quadtree cell
+QUADTREE_PRECISION = 0.05 # in meters
+# coverage regions are cached on disk (in RESULTS_PATH) and reused when
+# the same placement is simulated again (up to REGIONS_CACHE_SIZE)
+REGIONS_CACHE = 0
+REGIONS_CACHE_SIZE = 100 # in megabytes
 # useful constants (for readability)
 INFINITY = float('inf')
 MINUS_INFINITY = float('-inf')
@@ -0,0 +1,152 @@
+import numpy as np
+
+import config as cf
+
+"""Batched version of the energy model used in the two-level communi-
+cation phase (Network._two_level_comm). Instead of calling Node.transmit
+and Node.receive once per node, the energy of every transmission, recep-
+tion and aggregation is calculated with array operations. The results
+match the per-node path: batteries are drained in the same order, so
+the same nodes are depleted while receiving.
+"""
+
+def transmission_energy(distances, msg_lengths):
+  """Vectorized version of the transmitter energy model (see Node.trans-
+  mit).
+  """
+  amplifier = np.where(distances > cf.THRESHOLD_DIST,
+                       cf.E_MP*distances**4,
+                       cf.E_FS*distances**2)
+  return (cf.E_ELEC + amplifier)*msg_lengths
+
+def aggregation_costs(aggregation_function, payloads):
+  """Applies the aggregation function to every payload. Payloads usually
+  have a handful of distinct lengths, so the function is called once per
+  distinct length.
+  """
+  if len(payloads) == 0:
+    return np.zeros(0, dtype=np.int64)
+  lengths, inverse = np.unique(payloads, return_inverse=True)
+  costs = np.array([aggregation_function(int(x)) for x in lengths])
+  return costs[inverse].astype(np.int64)
+
+def _group_starts(keys):
+  """Returns a boolean array flagging the first element of every run of
+  equal (sorted) keys.
+  """
+  starts = np.ones(len(keys), dtype=bool)
+  starts[1:] = keys[1:] != keys[:-1]
+  return starts
+
+def _cumsum_by_group(values, starts):
+  """Cumulative sum of values that restarts at every group start."""
+  totals = np.cumsum(values)
+  offsets = (totals - values)[starts]
+  group_idx = np.cumsum(starts) - 1
+  return totals - offsets[group_idx]
+
+def two_level_comm(network):
+  """Ordinary nodes transmit to their cluster heads, then heads transmit
+  to the base station. Traffic counters (queues and amounts of transmit-
+  ted/received bits) are updated in place. Energies are not: the energy
+  drawn from each sensor node and the positions of the nodes whose bat-
+  tery got depleted (in the order they are depleted) are returned, so
+  the network can account for them.
+
+  Returns None if some ordinary node forwards messages to another ordi-
+  nary node, since then the order of transmissions matters and the per-
+  node path must be used.
+  """
+  state     = network.state
+  rows      = network._rows
+  alive     = state.alive[rows]
+  next_hops = state.next_hop[rows]
+  energies  = state.energy[rows]
+  consumed  = np.zeros(len(rows))
+  depleted  = np.zeros(len(rows), dtype=bool)
+
+  # ordinary nodes -> cluster heads
+  is_head  = alive & (next_hops == cf.BSID)
+  ordinary = alive & ~is_head
+  senders  = np.flatnonzero(ordinary & ~state.is_sleeping[rows])
+  receivers = network._positions_of(next_hops[senders])
+  if np.any(receivers < 0) or np.any(ordinary[receivers]):
+    return None
+
+  sender_rows = rows[senders]
+  msg_lengths = state.tx_queue_size[sender_rows] + cf.HEADER_LENGTH
+  tx_energies = transmission_energy(state.distance_to_endpoint[sender_rows],
+                                    msg_lengths)
+
+  # dead heads do not receive, but their nodes keep transmitting
+  msg_idx = np.flatnonzero(alive[receivers])
+  msg_idx = msg_idx[np.argsort(receivers[msg_idx], kind='mergesort')]
+  heads   = receivers[msg_idx]
+  received = msg_lengths[msg_idx]
+  aggregated = aggregation_costs(network.aggregation_function,
+                                 received - cf.HEADER_LENGTH)
+  # each reception draws the aggregation energy, then the receiver energy
+  steps = np.empty(2*len(msg_idx))
+  steps[0::2] = cf.E_DA*aggregated
+  steps[1::2] = cf.E_ELEC*received
+  step_starts = np.repeat(_group_starts(heads), 2)
+  step_starts[1::2] = False
+  spent_before = _cumsum_by_group(steps, step_starts) - steps
+  step_heads = np.repeat(heads, 2)
+  failed_steps = energies[step_heads] - spent_before < steps
+  failed = failed_steps[0::2] | failed_steps[1::2]
+  # messages after the one that depletes the head are not received
+  starts = _group_starts(heads)
+  previous_failures = _cumsum_by_group(failed.astype(int), starts) - failed
+  accepted = previous_failures == 0
+
+  nb_nodes = len(rows)
+  accepted_heads = heads[accepted]
+  consumed += np.bincount(accepted_heads, weights=steps[0::2][accepted] +
+                                                  steps[1::2][accepted],
+                          minlength=nb_nodes)
+  state.tx_queue_size[rows] += np.bincount(accepted_heads,
+                                           weights=aggregated[accepted],
+                                           minlength=nb_nodes).astype(np.int64)
+  state.amount_received[rows] += np.bincount(accepted_heads,
+                                             weights=received[accepted],
+                                             minlength=nb_nodes).astype(np.int64)
+  head_failures = accepted & failed
+  depleted[heads[head_failures]] = True
+  consumed[depleted] = energies[depleted]
+
+  sender_failures = energies[senders] < tx_energies
+  consumed[senders] = np.where(sender_failures, energies[senders], tx_energies)
+  depleted[senders[sender_failures]] = True
+  state.tx_queue_size[sender_rows] = 0
+  state.amount_transmitted[sender_rows] += msg_lengths
+
+  # depletion events in the order of the per-node path: a head is de-
+  # pleted while receiving a message, before the sender pays for it
+  event_keys = np.concatenate((2*msg_idx[head_failures],
+                               2*np.flatnonzero(sender_failures)+1))
+  event_nodes = np.concatenate((heads[head_failures],
+                                senders[sender_failures]))
+  events = [event_nodes[np.argsort(event_keys, kind='mergesort')]]
+
+  # cluster heads -> base station
+  heads = np.flatnonzero(is_head & ~depleted)
+  head_rows = rows[heads]
+  msg_lengths = state.tx_queue_size[head_rows] + cf.HEADER_LENGTH
+  tx_energies = transmission_energy(state.distance_to_endpoint[head_rows],
+                                    msg_lengths)
+  remaining = energies[heads] - consumed[heads]
+  head_failures = remaining < tx_energies
+  consumed[heads] += np.where(head_failures, remaining, tx_energies)
+  depleted[heads[head_failures]] = True
+  events.append(heads[head_failures])
+  state.tx_queue_size[head_rows] = 0
+  state.amount_transmitted[head_rows] += msg_lengths
+
+  base_station = network.get_BS()
+  aggregated = aggregation_costs(network.aggregation_function,
+                                 msg_lengths - cf.HEADER_LENGTH)
+  base_station.tx_queue_size   += int(aggregated.sum())
+  base_station.amount_received += int(msg_lengths.sum())
+
+  return consumed, np.concatenate(events)
@@ -3,18 +3,30 @@ import logging
 
 class EnergySource(object):
   def __init__(self, parent):
-    self.energy = cf.INITIAL_ENERGY
     self.node = parent
+    self.energy = cf.INITIAL_ENERGY
+
+  @property
+  def energy(self):
+    """The remaining energy is stored in the node's state row."""
+    return self.node._state.energy.item(self.node._row)
+
+  @energy.setter
+  def energy(self, value):
+    self.node._state.energy[self.node._row] = value
 
   def recharge(self):
     self.energy = cf.INITIAL_ENERGY
 
 class Battery(EnergySource):
   def consume(self, energy):
+    network = self.node.network_handler
     if self.energy >= energy:
       self.energy -= energy
+      network.residual_energy -= energy
     else:
       logging.info("node %d: battery is depleted." % (self.node.id))
+      network.residual_energy -= self.energy
       self.energy = 0
 
       self.node.battery_depletion()
@@ -1,7 +1,11 @@
 import config as cf
 import logging
+import numpy as np
 from python.network.node import *
+from python.network.node_state import *
+from python.network.batched_communication import two_level_comm
 from python.utils.grid import *
+from python.utils.spatial_index import SpatialIndex
 import matplotlib.pyplot as plt
 from python.utils.utils import *
 from python.utils.tracer import *
@@ -14,9 +18,16 @@ class Network(list):
   """
   def __init__(self, init_nodes=None):
     logging.debug('Instantiating nodes...')
+    # membership -> ids of the member nodes, updated by the nodes when
+    # their membership changes. Only the network that created the nodes
+    # keeps it (clusters scan their nodes).
+    self._members = None
     if init_nodes:
       self.extend(init_nodes)
+      # nodes keep their rows in the state where they were created
+      self.state = init_nodes[0]._state
     else:
+      self.state = NodeState(cf.NB_NODES+1)
       nodes = [Node(i, self) for i in range(0, cf.NB_NODES)]
       self.extend(nodes)
       # last node in nodes is the base station
@@ -29,11 +40,39 @@ class Network(list):
     for node in self:
       self._dict[node.id] = node
 
+    # rows (in self.state) and objects of the sensor nodes, in the same
+    # order as they appear in this list. Used to vectorize queries.
+    self._rows  = np.array([node._row for node in self[0:-1]], dtype=int)
+    self._nodes = np.empty(len(self._rows), dtype=object)
+    self._nodes[:] = self[0:-1]
+    # maps node ids to positions in self._rows (see _positions_of)
+    self._ids = np.array([node.id for node in self[0:-1]], dtype=int)
+    self._ids_order  = np.argsort(self._ids)
+    self._sorted_ids = self._ids[self._ids_order]
+    # sensor nodes do not move, so their positions are indexed only once
+    self.spatial_index = SpatialIndex(self.state.pos_x[self._rows],
+                                      self.state.pos_y[self._rows])
+
     self.perform_two_level_comm = 1
     self.round = 0
     self.centroids = []
     self.routing_protocol = None
     self.sleep_scheduler_class = None
+    self.aggregation_function = lambda x: 0
+    # cached leaves-to-root order for multi-hop communication, cleared
+    # when next hops change or nodes die (see _multi_hop_comm)
+    self._forwarding_order = None
+
+    # running index of alive nodes and sum of their residual energies,
+    # updated by the nodes as they consume energy and die. Only the net-
+    # work that created the nodes keeps them (clusters use their masks).
+    self.alive_ids = None
+    self.residual_energy = None
+    if not init_nodes:
+      self._reset_accumulators()
+      self._members = {}
+      for node in self[0:-1]:
+        self._move_member(node.id, None, node.membership)
 
     self.initial_energy = self.get_remaining_energy()
     self.first_depletion = 0
@@ -47,6 +86,9 @@ class Network(list):
     for node in self:
       node.energy_source.recharge()
       node.reactivate()
+    if self.alive_ids is not None:
+      self._reset_accumulators()
+    self._forwarding_order = None
 
     # allows for updates of BS position between simulations
     self[-1].pos_x = cf.BS_POS_X
@@ -58,11 +100,24 @@ class Network(list):
 
     self.routing_protocol = None
     self.sleep_scheduler_class = None
+    self.aggregation_function = lambda x: 0
 
     self.first_depletion = 0
     self.per30_depletion = 0
     self.perform_two_level_comm = 1
 
+  def _move_member(self, node_id, old_membership, new_membership):
+    """Updates the membership index when a node changes membership."""
+    if old_membership is not None:
+      self._members.get(old_membership, set()).discard(node_id)
+    self._members.setdefault(new_membership, set()).add(node_id)
+
+  def _reset_accumulators(self):
+    """Rebuilds the alive-node index and the residual energy sum."""
+    alive = self._alive_mask()
+    self.alive_ids = set(node.id for node in self._nodes[alive])
+    self.residual_energy = float(self.state.energy[self._rows][alive].sum())
+
   def simulate(self):
     tracer = Tracer()
 
@@ -73,7 +128,11 @@ class Network(list):
     self.deaths_this_round = 0
 
     if self.sleep_scheduler_class:
-      self._sleep_scheduler = SleepScheduler(self, self.sleep_scheduler_class)
+      if cf.SLEEP_SCHEDULING_PER_CLUSTER:
+        self._sleep_scheduler = ClusteredSleepScheduler(self,
+                                  self.sleep_scheduler_class)
+      else:
+        self._sleep_scheduler = SleepScheduler(self, self.sleep_scheduler_class)
 
     for round_nb in range(0, cf.MAX_ROUNDS):
       self.round = round_nb
@@ -127,9 +186,14 @@ class Network(list):
     self.energy_spent.append(before_energy - after_energy)
 
   def _sensing_phase(self):
-    """Every alive node captures information using its sensor."""
-    for node in self.get_alive_nodes():
-      node.sense()
+    """Every active node captures information using its sensor (vecto-
+    rized version of Node.sense).
+    """
+    # cluster heads cannot be put to sleep (see Node.is_sleeping)
+    self.state.is_sleeping[self._rows[self._heads_mask()]] = False
+    active = self._rows[self._active_mask()]
+    self.state.tx_queue_size[active]  = cf.MSG_LENGTH
+    self.state.amount_sensed[active] += cf.MSG_LENGTH
 
   def _communication_phase(self):
     """Each node transmits respecting its hierarchy: leaves start the 
@@ -142,82 +206,155 @@ class Network(list):
     #msg = str("%d ordinary nodes, %d heads." % (len(ordinary_nodes), len(heads)))
     #logging.debug("Hierarchical communication: %s" % (msg))
 
-    alive_nodes = self.get_alive_nodes()
     if self.perform_two_level_comm == 1:
-      self._two_level_comm(alive_nodes)
+      self._two_level_comm()
     else:
-      self._recursive_comm(alive_nodes)
+      self._multi_hop_comm()
 
-  def _recursive_comm(self, alive_nodes):
-    """Hierarchical communication using recursivity. This method suppo-
-    ses that there is no cycle in the network (network is a tree).
-    Otherwise, expect infinite loop.
+  def _multi_hop_comm(self):
+    """Hierarchical communication for any forest of next hops: nodes
+    transmit from the leaves to the roots (see _calculate_forwarding_
+    order). The order is cached until next hops change or nodes die.
     """
-    next_alive_nodes = alive_nodes[:]
-    for node in alive_nodes:
-      #check if other nodes must send info to this node
-      depends_on_other_node = 0
-      for other_node in alive_nodes:
-        #if other_node == node:
-        #  continue
-        if other_node.next_hop == node.id:
-          depends_on_other_node = 1
-          break
-
-      if not depends_on_other_node:
-        node.transmit()
-        next_alive_nodes = [n for n in next_alive_nodes if n != node]
-
-    if len(next_alive_nodes) == 0:
-      return
-    else:
-      self._recursive_comm(next_alive_nodes)
+    if self._forwarding_order is None:
+      self._forwarding_order = self._calculate_forwarding_order()
+    for node in self._nodes[self._forwarding_order]:
+      node.transmit()
 
-  def _two_level_comm(self, alive_nodes):
+  def _calculate_forwarding_order(self):
+    """Sorts alive nodes from the leaves to the roots of the next hop
+    forest. A node transmits once every alive node that forwards to it
+    has transmitted. Nodes that are ready at the same time keep their
+    order in this list. Raises ValueError if next hops form a cycle.
+    """
+    alive = self._alive_mask()
+    parents = self._positions_of(self.state.next_hop[self._rows])
+    # only alive nodes wait for (alive) nodes that forward to them
+    forwards = alive & (parents >= 0)
+    forwards[forwards] = alive[parents[forwards]]
+    parents[~forwards] = -1
+    nb_children = np.bincount(parents[parents >= 0], minlength=len(alive))
+
+    levels = []
+    ready = np.flatnonzero(alive & (nb_children == 0))
+    while len(ready):
+      levels.append(ready)
+      forwarded = parents[ready]
+      forwarded = forwarded[forwarded >= 0]
+      nb_children -= np.bincount(forwarded, minlength=len(alive))
+      forwarded = np.unique(forwarded)
+      ready = forwarded[nb_children[forwarded] == 0]
+
+    order = np.concatenate(levels) if levels else np.zeros(0, dtype=int)
+    if len(order) != np.count_nonzero(alive):
+      blocked = np.ones(len(alive), dtype=bool)
+      blocked[order] = False
+      ids = [node.id for node in self._nodes[blocked & alive]]
+      raise ValueError("next hops form a cycle among nodes %s" % ids)
+    return order
+
+  def _two_level_comm(self):
     """This method performs communication supposing that there are only
     ordinary nodes and cluster heads, this method is less generic than
-    its recursive version, but it is faster.
+    its multi-hop version, but it is faster.
     """
+    if cf.BATCHED_COMMUNICATION:
+      result = two_level_comm(self)
+      if result is not None:
+        self._consume(*result)
+        return
+
     # heads wait for all ordinary nodes, then transmit to BS
     for node in self.get_ordinary_nodes():
       node.transmit()
     for node in self.get_heads():
       node.transmit()
 
+  def _alive_mask(self):
+    """Boolean mask (over the sensor nodes) of the alive nodes."""
+    return self.state.alive[self._rows]
+
+  def _heads_mask(self):
+    """Boolean mask (over the sensor nodes) of the cluster heads."""
+    next_hops = self.state.next_hop[self._rows]
+    return self._alive_mask() & (next_hops == cf.BSID)
+
+  def _active_mask(self):
+    """Boolean mask (over the sensor nodes) of alive and awake nodes.
+    Cluster heads are always awake.
+    """
+    awake = ~self.state.is_sleeping[self._rows] | self._heads_mask()
+    return self._alive_mask() & awake
+
+  def _select(self, mask):
+    """Return the sensor nodes selected by a boolean mask."""
+    return list(self._nodes[mask])
+
+  def _consume(self, energies, depleted):
+    """Draws energies (one value per sensor node) from the batteries and
+    notifies the nodes (given by their positions) whose batteries were
+    depleted.
+    """
+    self.state.energy[self._rows] -= energies
+    # the base station always points to the network that owns the nodes
+    owner = self.get_BS().network_handler
+    owner.residual_energy -= float(energies.sum())
+    for node in self._nodes[depleted]:
+      logging.info("node %d: battery is depleted." % (node.id))
+      node.battery_depletion()
+
+  def _positions_of(self, ids):
+    """Return the positions (in self._rows) of the nodes with the given
+    ids, or -1 for ids that are not sensor nodes of this network.
+    """
+    if len(self._sorted_ids) == 0:
+      return np.full(len(ids), -1, dtype=int)
+    idx = np.searchsorted(self._sorted_ids, ids)
+    idx[idx == len(self._sorted_ids)] = 0
+    positions = self._ids_order[idx]
+    positions[self._sorted_ids[idx] != ids] = -1
+    return positions
+
   def get_alive_nodes(self):
     """Return nodes that have positive remaining energy."""
-    return [node for node in self[0:-1] if node.alive]
+    return self._select(self._alive_mask())
 
   def get_active_nodes(self):
     """Return nodes that have positive remaining energy and that are
     awake."""
-    is_active = lambda x: x.alive and not x.is_sleeping
-    return [node for node in self[0:-1] if is_active(node)]
+    return self._select(self._active_mask())
 
   def get_ordinary_nodes(self):
-    return [node for node in self if node.is_ordinary() and node.alive]
+    next_hops = self.state.next_hop[self._rows]
+    return self._select(self._alive_mask() & (next_hops != cf.BSID))
 
   def get_heads(self, only_alives=1):
-    input_set = self.get_alive_nodes() if only_alives else self
-    return [node for node in input_set if node.is_head()]
+    # dead nodes are never heads (see Node.is_head)
+    return self._select(self._heads_mask())
 
   def get_sensor_nodes(self):
     """Return all nodes except base station."""
     return [node for node in self[0:-1]]
 
+  def get_positions(self):
+    """Return the positions of the sensor nodes (one per row)."""
+    return np.column_stack((self.state.pos_x[self._rows],
+                            self.state.pos_y[self._rows]))
+
   def get_average_energy(self):
     return np.average(self.energy_spent)
 
   def someone_alive(self):
     """Finds if there is at least one node alive. It excludes the base station,
        which is supposed to be always alive."""
-    for node in self[0:-1]:
-      if node.alive == 1:
-        return 1
-    return 0
+    if self.alive_ids is not None:
+      return 1 if self.alive_ids else 0
+    return 1 if self._alive_mask().any() else 0
 
   def count_alive_nodes(self):
-    return sum(x.alive for x in self[:-1])
+    if self.alive_ids is not None:
+      return len(self.alive_ids)
+    return int(np.count_nonzero(self._alive_mask()))
 
   def get_BS(self):
     # intention: make code clearer for non-Python readers
@@ -242,23 +379,55 @@ class Network(list):
 
   def get_nodes_by_membership(self, membership, only_alives=1):
     """Returns all nodes that belong to this membership/cluster."""
-    input_set = self.get_alive_nodes() if only_alives else self
-    condition = lambda node: node.membership == membership and node.id != cf.BSID
-    return [node for node in input_set if condition(node)]
+    if self._members is None:
+      mask = self.state.membership[self._rows] == membership
+      if only_alives:
+        mask &= self._alive_mask()
+      return self._select(mask)
+
+    ids = list(self._members.get(membership, ()))
+    positions = np.sort(self._positions_of(ids))
+    positions = positions[positions >= 0]
+    if only_alives:
+      positions = positions[self.state.alive[self._rows[positions]]]
+    return list(self._nodes[positions])
+
+  def get_highest_energy_nodes(self, memberships):
+    """Returns, for each membership/cluster, its alive node with the
+    highest remaining energy (the first one in case of ties), or None if
+    all its nodes are dead.
+    """
+    positions = np.flatnonzero(self._alive_mask())
+    rows = self._rows[positions]
+    # sorted by membership, then by decreasing energy
+    order = np.lexsort((positions, -self.state.energy[rows],
+                        self.state.membership[rows]))
+    positions = positions[order]
+    groups = self.state.membership[rows][order]
+    firsts = np.flatnonzero(np.concatenate(([True], groups[1:] != groups[:-1])))
+    highest = dict(zip(groups[firsts].tolist(), positions[firsts].tolist()))
+    return [self._nodes[highest[membership]] if membership in highest else None
+            for membership in memberships]
+
+  def get_sensor_energies(self):
+    """Returns the remaining energies of the sensor nodes, in the order
+    of get_sensor_nodes, as a float32 array.
+    """
+    return self.state.energy[self._rows].astype(np.float32)
 
   def get_remaining_energy(self, ignore_nodes=None):
     """Returns the sum of the remaining energies at all nodes."""
-    set = self.get_alive_nodes()
-    if len(set) == 0:
-      return 0
+    if self.alive_ids is not None and not ignore_nodes:
+      return self.residual_energy if self.alive_ids else 0.0
+    mask = self._alive_mask()
     if ignore_nodes:
-      set = [node for node in set if node not in ignore_nodes]
-    transform = lambda x: x.energy_source.energy
-    energies = [transform(x) for x in set]
-    return sum(x for x in energies)
+      ignored_rows = [node._row for node in ignore_nodes]
+      mask &= ~np.in1d(self._rows, ignored_rows)
+    return float(self.state.energy[self._rows][mask].sum())
 
   def set_aggregation_function(self, function):
     """Sets the function that determines the cost of aggregation."""
+    self.aggregation_function = function
     for node in self:
       node.aggregation_function = function
     
@@ -268,11 +437,35 @@ class Network(list):
     clusters = []
     for cluster_idx in range(0, nb_clusters):
       nodes = self.get_nodes_by_membership(cluster_idx)
-      cluster = Network(init_nodes=nodes)
-      cluster.append(self.get_BS())
-      clusters.append(cluster)
+      clusters.append(self.get_cluster(nodes))
     return clusters
 
+  def get_cluster(self, nodes):
+    """Returns a network with nodes plus the base station. Nodes keep
+    their state in this network.
+    """
+    return Network(init_nodes=nodes+[self.get_BS()])
+
+  def get_nearest_nodes(self, xs, ys, only_alives=0):
+    """Returns, for each point, the nearest sensor node (None if there
+    is no candidate).
+    """
+    mask = self._alive_mask() if only_alives else None
+    positions, distances = self.spatial_index.nearest(xs, ys, mask)
+    return [self._nodes[pos] if pos >= 0 else None for pos in positions]
+
+  def get_neighbor_pairs(self, radius):
+    """Returns all pairs of alive sensor nodes that are within radius
+    of each other, as two arrays of positions (in get_sensor_nodes())
+    and an array of distances.
+    """
+    return self.spatial_index.pairs(radius, self._alive_mask())
+
+  def get_distances_to(self, node):
+    """Returns the distances from every sensor node to node."""
+    return np.hypot(self.state.pos_x[self._rows] - node.pos_x,
+                    self.state.pos_y[self._rows] - node.pos_y)
+
   def _calculate_nb_neighbors(self, target_node):
     """Calculate the number of neighbors given the sensor coverage
     radius.
@@ -282,29 +475,29 @@ class Network(list):
     if target_node.nb_neighbors != -1:
       # only check if there are dead nodes
       all_neighbors = target_node.neighbors
-      nb_dead_neighbors = sum(1 for x in all_neighbors if not x.alive)
       target_node.neighbors[:] = [x for x in all_neighbors if x.alive]
-      return target_node.nb_neighbors - nb_dead_neighbors
+      target_node.nb_neighbors = len(target_node.neighbors)
+      return target_node.nb_neighbors
+
+    position = self._positions_of([target_node.id])[0]
+    positions, distances = self.spatial_index.radius(target_node.pos_x,
+                                                     target_node.pos_y,
+                                                     cf.COVERAGE_RADIUS,
+                                                     self._alive_mask())
+    is_other = positions != position
+    positions, distances = positions[is_other], distances[is_other]
+    target_node.neighbors.extend(self._nodes[positions])
 
-    nb_neighbors = 0
     shortest_distance = cf.COVERAGE_RADIUS*2
-    for node in self.get_alive_nodes():
-      if node == target_node:
-        continue
-      distance = calculate_distance(target_node, node)
-      if distance <= cf.COVERAGE_RADIUS:
-        nb_neighbors += 1
-        target_node.neighbors.append(node) 
-        if distance < shortest_distance:
-          shortest_distance = distance
-
-    if shortest_distance != cf.INFINITY:
-      exclusive_radius = shortest_distance - cf.COVERAGE_RADIUS
-      if exclusive_radius < 0:
-        exclusive_radius = 0.0
-    
-    node.nb_neighbors = nb_neighbors
-    node.exclusive_radius = exclusive_radius
+    if len(distances):
+      shortest_distance = min(shortest_distance, distances.min())
+    exclusive_radius = shortest_distance - cf.COVERAGE_RADIUS
+    if exclusive_radius < 0:
+      exclusive_radius = 0.0
+
+    target_node.nb_neighbors = len(positions)
+    target_node.exclusive_radius = exclusive_radius
+    return target_node.nb_neighbors
 
   def update_neighbors(self):
     for node in self.get_alive_nodes():
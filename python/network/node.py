@@ -1,10 +1,32 @@
 import config as cf
 import numpy as np
 from python.network.energy_source import *
+from python.network.node_state import *
 from python.utils.utils import *
 
 class Node(object):
+  # attributes stored in a row of the network's NodeState arrays
+  pos_x                = StateField('pos_x')
+  pos_y                = StateField('pos_y')
+  alive                = StateField('alive')
+  _is_sleeping         = StateField('is_sleeping')
+  _next_hop            = StateField('next_hop')
+  distance_to_endpoint = StateField('distance_to_endpoint')
+  _membership          = StateField('membership')
+  tx_queue_size        = StateField('tx_queue_size')
+  amount_sensed        = StateField('amount_sensed')
+  amount_transmitted   = StateField('amount_transmitted')
+  amount_received      = StateField('amount_received')
+
   def __init__(self, id, parent = None):
+    # nodes that do not belong to a network (e.g. centroids) own a
+    # single-row state
+    if parent is not None:
+      self._state = parent.state
+    else:
+      self._state = NodeState()
+    self._row = self._state.new_row()
+
     self.pos_x = np.random.uniform(0, cf.AREA_WIDTH)
     self.pos_y = np.random.uniform(0, cf.AREA_LENGTH)
 
@@ -45,10 +67,23 @@ class Node(object):
 
   @next_hop.setter
   def next_hop(self, value):
+    if value != self._next_hop:
+      self.network_handler._forwarding_order = None
     self._next_hop = value
     distance = calculate_distance(self, self.network_handler[value])
     self.distance_to_endpoint = distance
 
+  @property
+  def membership(self):
+    return self._membership
+
+  @membership.setter
+  def membership(self, value):
+    network = self.network_handler
+    if network is not None and network._members is not None:
+      network._move_member(self.id, self._membership, value)
+    self._membership = value
+
   @property
   def is_sleeping(self):
     if self.is_head():
@@ -166,8 +201,14 @@ class Node(object):
     self.amount_sensed += cf.MSG_LENGTH
 
   def battery_depletion(self):
+    # a node may draw energy again after depletion (e.g. receiving right
+    # after aggregating), but it only dies once
+    if not self.alive:
+      return
     self.alive = 0
     self.sleep_prob = 0.0
     self.time_of_death = self.network_handler.round
     self.network_handler.deaths_this_round += 1
+    self.network_handler.alive_ids.discard(self.id)
+    self.network_handler._forwarding_order = None
 
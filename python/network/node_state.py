@@ -0,0 +1,68 @@
+import numpy as np
+
+import config as cf
+
+"""Structure-of-arrays storage for the per-node state. Every attribute
+that is read or written on every round is stored in a contiguous NumPy
+array, so network-wide queries become array operations instead of
+walks over Python objects. Node objects are thin views onto one row.
+"""
+
+class NodeState(object):
+  """Stores the state of a set of nodes. Each node owns one row of every
+  array. Rows are handed out by new_row() and the arrays grow on demand.
+  """
+
+  # field name: dtype
+  _fields = {'pos_x'               : np.float64,
+             'pos_y'               : np.float64,
+             'energy'              : np.float64,
+             'alive'               : np.bool_,
+             'is_sleeping'         : np.bool_,
+             'next_hop'            : np.int64,
+             'distance_to_endpoint': np.float64,
+             'membership'          : np.int64,
+             'tx_queue_size'       : np.int64,
+             'amount_sensed'       : np.int64,
+             'amount_transmitted'  : np.int64,
+             'amount_received'     : np.int64}
+
+  def __init__(self, capacity=1):
+    self.size = 0
+    self._capacity = max(capacity, 1)
+    for name, dtype in self._fields.items():
+      setattr(self, name, np.zeros(self._capacity, dtype=dtype))
+
+  def new_row(self):
+    """Reserve a row for a new node and return its index."""
+    if self.size == self._capacity:
+      self._grow()
+    row = self.size
+    self.size += 1
+    return row
+
+  def _grow(self):
+    """Doubles the capacity of every array, keeping its content."""
+    self._capacity *= 2
+    for name in self._fields:
+      old = getattr(self, name)
+      new = np.zeros(self._capacity, dtype=old.dtype)
+      new[:len(old)] = old
+      setattr(self, name, new)
+
+
+class StateField(object):
+  """Descriptor that maps a node attribute to its row in the NodeState
+  arrays. Values are returned as Python scalars, so scalar code keeps
+  the same arithmetic it had with plain attributes.
+  """
+  def __init__(self, name):
+    self.name = name
+
+  def __get__(self, node, owner):
+    if node is None:
+      return self
+    return getattr(node._state, self.name).item(node._row)
+
+  def __set__(self, node, value):
+    getattr(node._state, self.name)[node._row] = value
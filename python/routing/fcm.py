@@ -1,10 +1,10 @@
 
-import skfuzzy
 import numpy as np
 import logging, sys
 
 from python.routing.mte import *
 from python.utils.utils import *
+from python.utils import fuzzy_c_means
 from python.network.node import *
 from python.network.network import Network
 from python.routing.routing_protocol import *
@@ -16,6 +16,9 @@ BS uses FCM to define clusters and broadcast this information to the
 network. Finally, a round is executed.
 """
 class FCM(RoutingProtocol):
+  def __init__(self):
+    # centroids of the last clustering (warm start)
+    self._centroids = None
 
   #def _initial_setup(self, network):
   def _setup_phase(self, network):
@@ -40,41 +43,42 @@ class FCM(RoutingProtocol):
     # different result than the paper
     nb_clusters = cf.NB_CLUSTERS
   
-    # format data to shape expected by skfuzzy API
-    data = [[node.pos_x, node.pos_y] for node in network[0:-1]]
-    data = np.array(data).transpose()
-    centroids, membership = skfuzzy.cluster.cmeans(data, nb_clusters,
-                                                   cf.FUZZY_M, error=0.005,
-                                                   maxiter=1000, 
-                                                   init=None)[0:2]
+    # warm start from the last clustering: nodes do not move, so it
+    # converges in a few iterations
+    init_centroids = None
+    if cf.FCM_WARM_START and self._centroids is not None and \
+       len(self._centroids) == nb_clusters:
+      init_centroids = self._centroids
+    data = network.get_positions()
+    centroids, membership = fuzzy_c_means.cmeans(data, nb_clusters,
+                                                 cf.FUZZY_M, error=0.005,
+                                                 maxiter=1000,
+                                                 init_centroids=init_centroids)[0:2]
+    self._centroids = centroids
     # assign node nearest to centroid as cluster head
     heads = []
     # also annotates centroids to network
     network.centroids = []
+    nearest_nodes = network.get_nearest_nodes(centroids[:,0], centroids[:,1])
     for cluster_id, centroid in enumerate(centroids):
       tmp_centroid = Node(0)
       tmp_centroid.pos_x = centroid[0]
       tmp_centroid.pos_y = centroid[1]
       network.centroids.append(tmp_centroid)
-      nearest_node = None
-      shortest_distance = cf.INFINITY
-      for node in network[0:-1]:
-        distance = calculate_distance(node, tmp_centroid)
-        if distance < shortest_distance:
-          nearest_node      = node
-          shortest_distance = distance
+      nearest_node = nearest_nodes[cluster_id]
       nearest_node.next_hop   = cf.BSID
       nearest_node.membership = cluster_id
       heads.append(nearest_node)
-  
-    # assign ordinary network to cluster heads using fcm
-    for i, node in enumerate(network[0:-1]):
-      if node in heads: # node is already a cluster head
+
+    # assign ordinary nodes to the cluster with the highest membership
+    head_ids    = [head.id for head in heads]
+    cluster_ids = np.argmax(membership, axis=0)
+    head_set    = set(head_ids)
+    for node, cluster_id in zip(sensor_nodes, cluster_ids.tolist()):
+      if node.id in head_set: # node is already a cluster head
         continue
-      cluster_id      = np.argmax(membership[:,i])
       node.membership = cluster_id
-      head = [x for x in heads if x.membership == cluster_id][0]
-      node.next_hop   = head.id
+      node.next_hop   = head_ids[cluster_id]
 
     self.head_rotation(network)
   
@@ -84,21 +88,13 @@ class FCM(RoutingProtocol):
     # head rotation
     # current cluster heads choose next cluster head with the most
     # residual energy and nearest to the cluster centroid
-    for cluster_id in range(0, cf.NB_CLUSTERS):
-      cluster = network.get_nodes_by_membership(cluster_id)
+    next_heads = network.get_highest_energy_nodes(range(0, cf.NB_CLUSTERS))
+    for cluster_id, next_head in enumerate(next_heads):
       # check if there is someone alive in this cluster
-      if len(cluster) == 0:
+      if next_head is None:
         continue
-  
-      # someone is alive, find node with highest energy in the cluster
-      # to be the next cluster head
-      highest_energy = cf.MINUS_INFINITY
-      next_head      = None
-      for node in cluster:
-        if node.energy_source.energy > highest_energy:
-          highest_energy = node.energy_source.energy
-          next_head      = node
-  
+
+      cluster = network.get_nodes_by_membership(cluster_id)
       for node in cluster:
         node.next_hop = next_head.id
       next_head.next_hop = cf.BSID
@@ -3,6 +3,7 @@ import config as cf
 
 from python.network.network import *
 from python.routing.routing_protocol import *
+from python.utils.spatial_index import SpatialIndex
 
 class LEACH(RoutingProtocol):
 
@@ -35,16 +36,13 @@ class LEACH(RoutingProtocol):
   
     # ordinary network choose nearest cluster heads
     logging.info('LEACH: ordinary nodes choose nearest nearest cluster head')
-    for node in alive_nodes:
-      if node in heads: # node is cluster head
-        continue
-      nearest_head = heads[0]
-      # find the nearest cluster head
-      for head in heads[1:]:
-        if calculate_distance(node, nearest_head) > calculate_distance(node, head):
-          nearest_head = head
-  
-      node.next_hop = nearest_head.id
+    ordinary_nodes = [node for node in alive_nodes if node not in heads]
+    heads_index = SpatialIndex.from_nodes(heads)
+    xs = [node.pos_x for node in ordinary_nodes]
+    ys = [node.pos_y for node in ordinary_nodes]
+    nearest_heads = heads_index.nearest(xs, ys)[0]
+    for node, head_idx in zip(ordinary_nodes, nearest_heads):
+      node.next_hop = heads[head_idx].id
   
     network.broadcast_next_hop()
 
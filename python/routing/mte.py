@@ -1,6 +1,8 @@
 # -*- coding: utf-8 -*-
 import logging, sys
+import numpy as np
 from python.routing.dijkstra import *
+from python.routing.shortest_path_tree import ShortestPathTree
 from python.utils.utils import *
 from python.network.node import *
 from python.network.network import Network
@@ -8,6 +10,10 @@ from python.routing.routing_protocol import *
 import config as cf
 
 class MTE(RoutingProtocol):
+  def __init__(self):
+    # shortest path tree of the last route calculation (single source)
+    self._tree = None
+
   def _find_shortest_path(self, network):
     """The base station decides the next-hop for every node using
     Dijkstra's algorithm (shortest path). Then it broadcasts this infor-
@@ -22,20 +28,93 @@ class MTE(RoutingProtocol):
       rence (RAWCON 98), pages 55–58, Aug. 1998
     """
     logging.info('MTE: setup phase')
-  
+    if cf.MTE_SINGLE_SOURCE:
+      if cf.MTE_INCREMENTAL_REPAIR and self._tree is not None:
+        self._repair_routes(network)
+      else:
+        self._single_source_routes(network)
+    else:
+      self._per_node_routes(network)
+
+  def _single_source_routes(self, network):
+    """Routes are the branches of the shortest path tree rooted at the
+    base station, calculated by a single Dijkstra run over a sparse cost
+    graph. The next hop of a node is its parent in that tree.
+    """
+    sensor_nodes = network.get_sensor_nodes()
+    tree = self._build_tree(network, sensor_nodes)
+    tree.compute()
+    self._tree = tree
+    self._sensor_nodes = sensor_nodes
+    self._set_next_hops(range(0, len(sensor_nodes)))
+
+  def _repair_routes(self, network):
+    """Removes the nodes that died since the last calculation from the
+    cached tree, and updates the next hop of the nodes whose route went
+    through them.
+    """
+    dead = [position for position, node in enumerate(self._sensor_nodes)
+            if not node.alive and not self._tree.removed[position]]
+    repaired = self._tree.remove(dead)
+    self._set_next_hops(repaired.tolist())
+
+  def _set_next_hops(self, positions):
+    """Sets the next hop of the (alive) nodes at the given positions to
+    their parents in the tree.
+    """
+    tree = self._tree
+    for position in positions:
+      node = self._sensor_nodes[position]
+      if not node.alive:
+        continue
+      parent = tree.parents[position]
+      if parent == -1:
+        logging.warning('MTE: node %d cannot reach the BS.' % (node.id))
+        node.next_hop = cf.BSID
+      elif parent == tree.root:
+        node.next_hop = cf.BSID
+      else:
+        node.next_hop = self._sensor_nodes[parent].id
+
+  def _build_tree(self, network, sensor_nodes):
+    """Builds the cost graph of the alive nodes and the base station
+    (the last vertex). Links longer than TX_RANGE are left out if
+    MTE_HONOR_TX_RANGE is set.
+    """
+    radius = cf.TX_RANGE if cf.MTE_HONOR_TX_RANGE else cf.INFINITY
+    first, second, distances = network.get_neighbor_pairs(radius)
+
+    alive = np.array([node.alive for node in sensor_nodes], dtype=bool)
+    distances_to_BS = network.get_distances_to(network.get_BS())
+    linked_to_BS = np.flatnonzero(alive & (distances_to_BS <= radius))
+    root = len(sensor_nodes)
+    first  = np.concatenate((first, linked_to_BS))
+    second = np.concatenate((second, np.full(len(linked_to_BS), root,
+                                             dtype=int)))
+    distances = np.concatenate((distances, distances_to_BS[linked_to_BS]))
+    return ShortestPathTree(root+1, first, second, self._cost(distances),
+                            root)
+
+  def _per_node_routes(self, network):
+    """Runs Dijkstra from every node that has no route yet, over the
+    complete cost graph (in dict form).
+    """
     # generate cost graph only for alive network (in dict form):
     # origin_id: {dest_id1: cost1, dest_id2: cost2, ...}, ...
     alive_nodes = network.get_alive_nodes()
-    alive_nodes_and_BS = alive_nodes + [network.get_BS()]
-    G = {}
-    for node in alive_nodes_and_BS:
-      G[node.id] = {}
-      for other in alive_nodes_and_BS:
-        if other == node:
-          continue
-        distance = calculate_distance(node, other)
-        cost = distance**2 if distance < cf.THRESHOLD_DIST else distance**4
-        G[node.id][other.id] = cost
+    base_station = network.get_BS()
+    distances = [calculate_distance(node, base_station) for node in alive_nodes]
+    costs = self._cost(np.array(distances)).tolist()
+    G = {cf.BSID: {}}
+    for node, cost in zip(alive_nodes, costs):
+      G[node.id] = {cf.BSID: cost}
+      G[cf.BSID][node.id] = cost
+    ids = [node.id for node in network.get_sensor_nodes()]
+    first, second, distances = network.get_neighbor_pairs(cf.INFINITY)
+    costs = self._cost(distances)
+    for pos1, pos2, cost in zip(first.tolist(), second.tolist(), costs.tolist()):
+      G[ids[pos1]][ids[pos2]] = cost
+      G[ids[pos2]][ids[pos1]] = cost
   
     # calculate shortest path and set next_hop accordingly
     done = []
@@ -50,6 +129,10 @@ class MTE(RoutingProtocol):
         alive_nodes = [node for node in alive_nodes if node.id != id]
         done.append(id)
 
+  def _cost(self, distance):
+    """Cost of the links with the given distances (array)."""
+    return np.where(distance < cf.THRESHOLD_DIST, distance**2, distance**4)
+
   def _setup_phase(self, network):
     """Every node communicate its position to the base station. Then the 
     BS uses MTE to choose the routes and broadcasts this information to 
@@ -0,0 +1,101 @@
+import heapq
+import numpy as np
+
+"""Shortest path tree over a sparse, undirected graph stored in CSR form
+(compressed sparse rows). Since every route ends at the base station,
+a single Dijkstra run from the base station gives the next hop of every
+node: the parent of a vertex in the tree.
+"""
+
+class ShortestPathTree(object):
+  """Shortest path tree rooted at vertex root. Edges are given as pairs
+  of vertices (first[k], second[k]) with cost costs[k], and are used in
+  both directions.
+  """
+
+  def __init__(self, nb_vertices, first, second, costs, root):
+    self.nb_vertices = nb_vertices
+    self.root = root
+
+    # CSR adjacency: neighbors of u are neighbors[offsets[u]:offsets[u+1]]
+    sources = np.concatenate((first, second))
+    targets = np.concatenate((second, first))
+    weights = np.concatenate((costs, costs))
+    order = np.argsort(sources, kind='mergesort')
+    self._neighbors = targets[order]
+    self._weights   = weights[order]
+    self._offsets   = np.zeros(nb_vertices+1, dtype=int)
+    np.cumsum(np.bincount(sources, minlength=nb_vertices),
+              out=self._offsets[1:])
+
+    self.distances = np.full(nb_vertices, np.inf)
+    self.parents   = np.full(nb_vertices, -1, dtype=int)
+    self.removed   = np.zeros(nb_vertices, dtype=bool)
+
+  def compute(self):
+    """Runs Dijkstra's algorithm from the root. Vertices that cannot be
+    reached keep parent -1 and distance infinity.
+    """
+    self.distances[:] = np.inf
+    self.parents[:] = -1
+    self.distances[self.root] = 0.0
+    self._run([(0.0, self.root)])
+
+  def remove(self, vertices):
+    """Removes vertices (and their edges) from the graph and repairs the
+    tree. Removing vertices never shortens a path, so only the vertices
+    whose path went through a removed one are recalculated, starting from
+    the vertices around them. Returns the recalculated vertices.
+    """
+    self.removed[vertices] = True
+    subtrees = self._subtrees(vertices)
+    self.distances[subtrees] = np.inf
+    self.parents[subtrees] = -1
+    repaired = subtrees[~self.removed[subtrees]]
+
+    around = [self._neighbors[self._offsets[v]:self._offsets[v+1]]
+              for v in repaired.tolist()]
+    around = np.unique(np.concatenate(around)) if around else repaired
+    around = around[np.isfinite(self.distances[around])]
+    self._run(list(zip(self.distances[around].tolist(), around.tolist())))
+    return repaired
+
+  def _subtrees(self, vertices):
+    """Returns the vertices of the subtrees rooted at vertices."""
+    has_parent = np.flatnonzero(self.parents >= 0)
+    children = has_parent[np.argsort(self.parents[has_parent],
+                                     kind='mergesort')]
+    offsets = np.zeros(self.nb_vertices+1, dtype=int)
+    np.cumsum(np.bincount(self.parents[has_parent],
+                          minlength=self.nb_vertices), out=offsets[1:])
+
+    subtrees = [np.asarray(vertices, dtype=int)]
+    frontier = subtrees[0].tolist()
+    while frontier:
+      next_frontier = [children[offsets[v]:offsets[v+1]] for v in frontier]
+      next_frontier = np.concatenate(next_frontier)
+      subtrees.append(next_frontier)
+      frontier = next_frontier.tolist()
+    return np.unique(np.concatenate(subtrees))
+
+  def _run(self, heap):
+    """Dijkstra's main loop, using a binary heap of (distance, vertex)
+    pairs. Outdated pairs (vertex already settled with a shorter dis-
+    tance) are skipped when popped.
+    """
+    distances = self.distances
+    heapq.heapify(heap)
+    while heap:
+      distance, vertex = heapq.heappop(heap)
+      if distance > distances[vertex]:
+        continue
+      start, end = self._offsets[vertex], self._offsets[vertex+1]
+      neighbors = self._neighbors[start:end]
+      candidates = distance + self._weights[start:end]
+      improved = (candidates < distances[neighbors]) & \
+                 ~self.removed[neighbors]
+      neighbors, candidates = neighbors[improved], candidates[improved]
+      distances[neighbors] = candidates
+      self.parents[neighbors] = vertex
+      for neighbor, candidate in zip(neighbors.tolist(), candidates.tolist()):
+        heapq.heappush(heap, (candidate, neighbor))
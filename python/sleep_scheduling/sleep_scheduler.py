@@ -1,10 +1,13 @@
 import numpy as np
 import logging
+import zlib
 from time import time
 
 import config as cf
 from python.utils.grid import *
 from python.utils.regions_converter import *
+from python.utils.region_quadtree import calculate_regions
+from python.utils import regions_cache
 from python.utils.utils import *
 from cc.genetic_algorithm import *
 from cc.pso import *
@@ -17,25 +20,36 @@ all coverage information.
 """
 class SleepScheduler(object):
 
-  def __init__(self, cluster, optimizer_class):
+  def __init__(self, cluster, optimizer_class, seed=None):
     # need to update neighbors through this method, so grid can be
     # generated faster
     cluster.update_neighbors()
     self._cluster = cluster
     
-    grid = Grid()
-    for node in cluster.get_sensor_nodes():
-      grid.add_node(node, cf.COVERAGE_RADIUS)
-    regions_converter = RegionsConverter(grid)
-    exclusive_regions, overlapping_regions = regions_converter.convert()
-
-    config_int =   {'NB_INDIVIDUALS': cf.NB_INDIVIDUALS,
-                    'MAX_ITERATIONS': cf.MAX_ITERATIONS}
-    config_float = {'FITNESS_ALPHA' : cf.FITNESS_ALPHA,
-                    'FITNESS_BETA'  : cf.FITNESS_BETA,
-                    'FITNESS_GAMMA' : cf.FITNESS_GAMMA,
-                    'WMAX'          : cf.WMAX,
-                    'WMIN'          : cf.WMIN}
+    exclusive_regions, overlapping_regions = self._get_regions(cluster)
+    # the optimizer indexes nodes by their position in the cluster, not by
+    # their id (they only match when the cluster is the whole network)
+    positions = {node.id: idx
+                 for idx, node in enumerate(cluster.get_sensor_nodes())}
+    exclusive_regions = {positions[node_id]: area
+                         for node_id, area in exclusive_regions.items()}
+    overlapping_regions = [([positions[node_id] for node_id in owners], area)
+                           for owners, area in overlapping_regions]
+
+    config_int =   {'NB_INDIVIDUALS'   : cf.NB_INDIVIDUALS,
+                    'MAX_ITERATIONS'   : cf.MAX_ITERATIONS,
+                    'NB_THREADS'       : cf.NB_THREADS,
+                    'WARM_START'       : cf.WARM_START,
+                    'STAGNATION_WINDOW': cf.STAGNATION_WINDOW,
+                    'SEED'             : cf.OPTIMIZER_SEED
+                                         if seed is None else seed}
+    config_float = {'FITNESS_ALPHA'  : cf.FITNESS_ALPHA,
+                    'FITNESS_BETA'   : cf.FITNESS_BETA,
+                    'FITNESS_GAMMA'  : cf.FITNESS_GAMMA,
+                    'WMAX'           : cf.WMAX,
+                    'WMIN'           : cf.WMIN,
+                    'MIN_IMPROVEMENT': cf.MIN_IMPROVEMENT,
+                    'TIME_BUDGET'    : cf.TIME_BUDGET}
 
     configuration = (config_int, config_float)
     ids = [node.id for node in cluster.get_sensor_nodes()] 
@@ -43,6 +57,31 @@ class SleepScheduler(object):
     self._optimizer = optimizer_class(exclusive_regions, overlapping_regions,
                                 ids, configuration)
 
+  def _get_regions(self, cluster):
+    """Returns the exclusive and overlapping coverage regions of the
+    cluster, from the on-disk cache if the same placement was seen
+    before.
+    """
+    sensor_nodes = cluster.get_sensor_nodes()
+    if cf.REGIONS_CACHE:
+      key = regions_cache.regions_key(sensor_nodes)
+      regions = regions_cache.load(key)
+      if regions is not None:
+        return regions
+
+    if cf.COVERAGE_MODEL == 'quadtree':
+      regions = calculate_regions(sensor_nodes, cf.COVERAGE_RADIUS)
+    else:
+      grid = Grid()
+      for node in sensor_nodes:
+        grid.add_node(node, cf.COVERAGE_RADIUS)
+      regions_converter = RegionsConverter(grid)
+      regions = regions_converter.convert()
+
+    if cf.REGIONS_CACHE:
+      regions_cache.store(key, regions)
+    return regions
+
   def schedule(self):
     """Runs PSO to decide which nodes in the cluster will sleep. The cur-
     rent cluster head should not be put to sleep, otherwise all informa-
@@ -59,7 +98,8 @@ class SleepScheduler(object):
     self._cluster.update_sleep_prob()
     sensor_nodes = self._cluster.get_sensor_nodes()
     node_ids = [node.id for node in sensor_nodes]
-    energies = [node.energy_source.energy for node in sensor_nodes]
+    # passed as a float32 buffer, read by the optimizer without conversion
+    energies = self._cluster.get_sensor_energies()
     #head_id  = (self._cluster.get_heads())[0].id
 
     best_configuration = self._optimizer.Run(energies)
@@ -71,14 +111,14 @@ class SleepScheduler(object):
 
     #print("best cov: %f, best over: %f" %(best_coverage, best_overlapping))
     #print("init: %f, final: %f" %(learning_trace[0], learning_trace[-1]))
-    #print(sum(ord(x) for x in best_configuration))
+    #print(sum(best_configuration))
     
     #plot_curves({'scenario': learning_trace})
     #logging.info('search finished.')
     #print(self._best_configuration)
     # actually put nodes to sleep
     nb_alive = len(self._cluster.get_alive_nodes())
-    nb_sleeping = sum(ord(y) for x, y in zip(self._cluster, best_configuration) if x.alive)
+    nb_sleeping = sum(y for x, y in zip(self._cluster, best_configuration) if x.alive)
     sleeping_rate = float(nb_sleeping)/float(nb_alive)
     #print("coverage %f, active rate %f" %(best_coverage, 1-sleeping_rate))
     log = {}
@@ -91,13 +131,90 @@ class SleepScheduler(object):
     log['term1_final']     = term1_trace[-1]
     log['term2_initial']   = term2_trace[0]
     log['term2_final']     = term2_trace[-1]
+    # one trace value per iteration done
+    log['nb_iterations']   = len(learning_trace)
 
     #print("sleeping nodes %d out of %d" %(nb_sleeping_nodes, len(best_configuration)))
     #print([x.id for x in self._cluster if x.alive])
 
     # set cluster's nodes to sleep accordingly to optimization algorithm
     for idx, node in enumerate(sensor_nodes):
-      node.is_sleeping = ord(best_configuration[idx])
+      node.is_sleeping = int(best_configuration[idx])
 
     return log
 
+
+class ClusteredSleepScheduler(object):
+  """Runs one SleepScheduler per cluster instead of a single one over the
+  whole network: several small problems are much cheaper to optimize than
+  a big one. Clusters are scheduled concurrently, since the optimizers
+  release the GIL while they run.
+  """
+
+  def __init__(self, network, optimizer_class):
+    self._network = network
+    self._optimizer_class = optimizer_class
+    # ids of the cluster nodes -> scheduler, kept while the cluster does
+    # not change
+    self._schedulers = {}
+    self._warned = False
+    nb_threads = cf.NB_SCHEDULING_THREADS or cf.NB_CLUSTERS
+    self._pool = ThreadPool(nb_threads) if nb_threads > 1 else None
+
+  def _get_schedulers(self):
+    """Returns the schedulers of the current clusters (nodes grouped by
+    membership) and the number of alive nodes in each of them. Nodes that
+    are not in a cluster yet (e.g. before the first setup phase) are not
+    scheduled.
+    """
+    clusters = {}
+    for node in self._network.get_sensor_nodes():
+      if node.membership == cf.BSID:
+        continue
+      clusters.setdefault(node.membership, []).append(node)
+
+    # only routing protocols that set the nodes' membership (e.g. FCM) form
+    # clusters; nodes have none before the first setup phase
+    if not clusters and self._network.round > 0 and not self._warned:
+      logging.warning('no node belongs to a cluster, so no node is put to '
+                      'sleep; per-cluster sleep scheduling needs a routing '
+                      'protocol that sets memberships (e.g. FCM).')
+      self._warned = True
+
+    schedulers, nb_alive, reused = [], [], {}
+    for membership in sorted(clusters):
+      nodes = clusters[membership]
+      key = frozenset(node.id for node in nodes)
+      scheduler = self._schedulers.get(key)
+      if scheduler is None:
+        cluster = self._network.get_cluster(nodes)
+        # each cluster draws its own random numbers
+        seed = zlib.crc32(repr((cf.OPTIMIZER_SEED, sorted(key)))) & 0xffffffff
+        scheduler = SleepScheduler(cluster, self._optimizer_class, seed)
+      reused[key] = scheduler
+      schedulers.append(scheduler)
+      nb_alive.append(sum(1 for node in nodes if node.alive))
+    self._schedulers = reused
+    return schedulers, nb_alive
+
+  def schedule(self):
+    """Schedules every cluster. Returns the clusters' logs averaged by
+    their number of alive nodes.
+    """
+    schedulers, nb_alive = self._get_schedulers()
+    if self._pool and len(schedulers) > 1:
+      logs = self._pool.map(SleepScheduler.schedule, schedulers)
+    else:
+      logs = [scheduler.schedule() for scheduler in schedulers]
+
+    log, total_weight = {}, 0.0
+    for cluster_log, weight in zip(logs, nb_alive):
+      # clusters with at most one alive node are not scheduled
+      if not cluster_log:
+        continue
+      total_weight += weight
+      for key, value in cluster_log.items():
+        log[key] = log.get(key, 0.0) + weight*value
+    for key in log:
+      log[key] /= total_weight
+    return log
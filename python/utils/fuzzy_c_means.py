@@ -0,0 +1,46 @@
+import numpy as np
+
+"""Vectorized Fuzzy C-Means clustering. Same algorithm as skfuzzy's
+cmeans, but it can be warm-started from the centroids of a previous run:
+when the points barely move between runs (e.g. FCM re-clustering every
+round), it converges in a few iterations instead of starting over from
+a random membership matrix.
+"""
+
+# avoids divisions by zero when a point lies on a centroid
+_EPSILON = np.finfo(np.float64).eps
+
+def cmeans(data, nb_clusters, m, error, maxiter, init_centroids=None):
+  """Clusters data (one point per row) into nb_clusters fuzzy clusters,
+  using fuzzyness coefficient m. Stops when the membership matrix changes
+  less than error (Frobenius norm) or after maxiter iterations. If init_
+  centroids is not given, starts from a random membership matrix.
+  Returns the centroids (one per row), the membership matrix (clusters x
+  points) and the number of iterations.
+  """
+  data = np.asarray(data, dtype=float)
+  if init_centroids is None:
+    membership = np.random.rand(nb_clusters, len(data))
+    membership /= membership.sum(axis=0)
+  else:
+    membership = _membership(data, np.asarray(init_centroids, dtype=float), m)
+
+  for iteration in range(1, maxiter+1):
+    previous   = membership
+    centroids  = _centroids(data, membership, m)
+    membership = _membership(data, centroids, m)
+    if np.linalg.norm(membership - previous) < error:
+      break
+  return centroids, membership, iteration
+
+def _centroids(data, membership, m):
+  """Returns the centroids given the membership matrix."""
+  weights = np.fmax(membership, _EPSILON)**m
+  return weights.dot(data)/weights.sum(axis=1)[:, np.newaxis]
+
+def _membership(data, centroids, m):
+  """Returns the membership matrix given the centroids."""
+  deltas = data[np.newaxis, :, :] - centroids[:, np.newaxis, :]
+  distances = np.fmax(np.sqrt((deltas**2).sum(axis=2)), _EPSILON)
+  membership = distances**(-2./(m - 1))
+  return membership/membership.sum(axis=0)
@@ -27,36 +27,22 @@ class Grid(object):
   """
 
   def __init__(self):
-    # pixels is a dictionary that follows the pattern:
-    # {pos_x0: {pos_y0: [node_id0, node_id1], pos_y1: []}, pos_x1:}
-    # only painted pixels are added to grid to save memory
-    self._pixels = {}
+    # painted pixels are stored as pairs (pixel, owner): pixel is the
+    # index x_idx*_nb_y + y_idx of the pixel on the grid (x_idx = x/GRID_
+    # PRECISION) and owner is the id of a node that covers it. Pairs are
+    # kept in arrays (one per painted node) and grouped on demand.
+    self._nb_y = int(_adjust2grid(cf.AREA_LENGTH)/cf.GRID_PRECISION) + 1
+    self._pixels = []
+    self._owners = []
 
     # for nodes that have no neighbors we just store the area
     # it supposes that the number of neighbors attribute (Node) was
     # already calculated
     self._exclusive_regions = []
 
-  def _paint_pixel(self, x, y, id):
-    """Paint pixel if not painted yet, or add node id to painted node.
-    """
-    if x not in self._pixels: # add line if it does not exist
-      self._pixels[x] = {}
-
-    if y in self._pixels[x]:
-      owners = self._pixels[x][y]
-      # pixel is already painted. Annotate node id to it.
-      owners.append(id)
-      logging.debug("overlapping pixel %s %s" %(x, y))
-    else:
-      # paint new pixel
-      self._pixels[x][y] = [id]
-      logging.debug("painting pixel %s %s" %(x, y))
-
   def add_node(self, node, coverage_radius):
-    """Paint the node on the grid. Assumes a circular radius. It is
-    optimized to skip exclusive regions (i.e. regions that are covered
-    by a single node.
+    """Paint the node on the grid. Assumes a circular radius. All pixels
+    in the bounding box of the circle are tested at once.
     """
     logging.info("adding node %d to grid" % (node.id))
     # covers a rectangular area around the circle, but paints only area
@@ -74,12 +60,28 @@ class Grid(object):
     if final_y > _adjust2grid(cf.AREA_LENGTH):
       final_y   = _adjust2grid(cf.AREA_LENGTH)
 
-    for pixel_x in np.arange(initial_x, final_x, cf.GRID_PRECISION):
-      for pixel_y in np.arange(initial_y, final_y, cf.GRID_PRECISION):
-        distance = calculate_distance_point(pixel_x, pixel_y,
-                                            node.pos_x, node.pos_y)
-        if distance < coverage_radius:
-          self._paint_pixel(str(_adjust2grid(pixel_x)),
-                            str(_adjust2grid(pixel_y)), 
-                            node.id)
+    pixels_x = np.arange(initial_x, final_x, cf.GRID_PRECISION)
+    pixels_y = np.arange(initial_y, final_y, cf.GRID_PRECISION)
+    # same arithmetic as calculate_distance_point
+    distances = np.sqrt((pixels_x[:, np.newaxis] - node.pos_x)**2 +
+                        (pixels_y[np.newaxis, :] - node.pos_y)**2)
+    inside = distances < coverage_radius
+    idx_x = (pixels_x/cf.GRID_PRECISION).astype(np.int64)
+    idx_y = (pixels_y/cf.GRID_PRECISION).astype(np.int64)
+    pixels = idx_x[:, np.newaxis]*self._nb_y + idx_y[np.newaxis, :]
+    self._pixels.append(pixels[inside])
+    self._owners.append(np.full(np.count_nonzero(inside), node.id,
+                                dtype=np.int64))
 
+  def get_pixel_owners(self):
+    """Returns the owners of each painted pixel (a list of arrays of node
+    ids, in the order the nodes were painted).
+    """
+    if not self._pixels:
+      return []
+    pixels = np.concatenate(self._pixels)
+    owners = np.concatenate(self._owners)
+    order  = np.argsort(pixels, kind='mergesort')
+    pixels, owners = pixels[order], owners[order]
+    starts = np.flatnonzero(pixels[1:] != pixels[:-1]) + 1
+    return np.split(owners, starts)
@@ -0,0 +1,117 @@
+import numpy as np
+
+import config as cf
+
+"""Calculates the coverage regions (see RegionsConverter) with an adap-
+tive quadtree instead of a pixel grid. Cells that are entirely inside or
+outside every disk are resolved at once, so only the cells crossed by a
+disk boundary are refined, down to cells of QUADTREE_PRECISION meters.
+The cost grows with the length of the boundaries instead of the area,
+which allows much finer accuracy than the grid.
+"""
+
+def calculate_regions(nodes, coverage_radius, precision=None):
+  """Returns the exclusive regions ({node id: area}) and the overlapping
+  regions ([(list of node ids, area)]) of the nodes' coverage disks, in
+  the format returned by RegionsConverter.convert. Only the area inside
+  the field is considered.
+  """
+  if precision is None:
+    precision = cf.QUADTREE_PRECISION
+  ids = np.array([node.id for node in nodes], dtype=np.int64)
+  centers_x = np.array([node.pos_x for node in nodes], dtype=float)
+  centers_y = np.array([node.pos_y for node in nodes], dtype=float)
+  # a set of owners is identified by the sum of their (random) keys, so
+  # cells can be grouped by owners with array operations. A local gener-
+  # ator is used to leave the simulation's random state untouched.
+  keys = np.random.RandomState(0).randint(1, 2**62, len(ids)).astype(np.int64)
+
+  # root cells: tiles of about one coverage radius
+  tile = max(coverage_radius, precision)
+  bounds_x = np.append(np.arange(0.0, cf.AREA_WIDTH, tile), cf.AREA_WIDTH)
+  bounds_y = np.append(np.arange(0.0, cf.AREA_LENGTH, tile), cf.AREA_LENGTH)
+  x0, y0 = [a.ravel() for a in np.meshgrid(bounds_x[:-1], bounds_y[:-1])]
+  x1, y1 = [a.ravel() for a in np.meshgrid(bounds_x[1:], bounds_y[1:])]
+  pair_cells, pair_disks = [a.ravel() for a in
+                            np.meshgrid(np.arange(len(x0)), np.arange(len(ids)),
+                                        indexing='ij')]
+
+  owners = {} # key sum -> owner ids
+  key_sums, areas = [], []
+  while len(x0):
+    cx, cy = centers_x[pair_disks], centers_y[pair_disks]
+    # nearest and farthest points of the cell to the disk center
+    near_x = np.maximum(np.maximum(x0[pair_cells] - cx, cx - x1[pair_cells]), 0)
+    near_y = np.maximum(np.maximum(y0[pair_cells] - cy, cy - y1[pair_cells]), 0)
+    far_x  = np.maximum(np.abs(cx - x0[pair_cells]), np.abs(cx - x1[pair_cells]))
+    far_y  = np.maximum(np.abs(cy - y0[pair_cells]), np.abs(cy - y1[pair_cells]))
+    inside  = np.hypot(far_x, far_y) <= coverage_radius
+    crossed = ~inside & (np.hypot(near_x, near_y) < coverage_radius)
+    kept = inside | crossed
+    pair_cells, pair_disks = pair_cells[kept], pair_disks[kept]
+    inside, crossed = inside[kept], crossed[kept]
+
+    # cells that are not crossed by any boundary (or that are too small
+    # to be split) are resolved; the latter by their center point
+    nb_cells = len(x0)
+    is_crossed = np.bincount(pair_cells[crossed], minlength=nb_cells) > 0
+    splittable = np.maximum(x1 - x0, y1 - y0) > precision
+    resolved = ~(is_crossed & splittable)
+    at_center = crossed & resolved[pair_cells]
+    center_x = (x0[pair_cells[at_center]] + x1[pair_cells[at_center]])/2
+    center_y = (y0[pair_cells[at_center]] + y1[pair_cells[at_center]])/2
+    covers = inside & resolved[pair_cells]
+    covers[at_center] = np.hypot(center_x - centers_x[pair_disks[at_center]],
+                                 center_y - centers_y[pair_disks[at_center]]) \
+                        < coverage_radius
+    _group_cells(pair_cells[covers], pair_disks[covers], (x1 - x0)*(y1 - y0),
+                 ids, keys, owners, key_sums, areas)
+
+    # split the other cells in four
+    pending = ~resolved
+    ranks = np.cumsum(pending) - 1
+    mid_x, mid_y = (x0 + x1)/2, (y0 + y1)/2
+    x0, x1, y0, y1, mid_x, mid_y = [a[pending] for a in
+                                    (x0, x1, y0, y1, mid_x, mid_y)]
+    x0, x1 = np.concatenate((x0, mid_x, x0, mid_x)), \
+             np.concatenate((mid_x, x1, mid_x, x1))
+    y0, y1 = np.concatenate((y0, y0, mid_y, mid_y)), \
+             np.concatenate((mid_y, mid_y, y1, y1))
+    carried = pending[pair_cells]
+    pair_cells = ranks[pair_cells[carried]]
+    pair_disks = pair_disks[carried]
+    nb_pending = len(mid_x)
+    pair_cells = np.concatenate([pair_cells + k*nb_pending for k in range(4)])
+    pair_disks = np.tile(pair_disks, 4)
+
+  if not key_sums:
+    return {}, []
+  key_sums, inverse = np.unique(np.concatenate(key_sums), return_inverse=True)
+  region_areas = np.bincount(inverse, weights=np.concatenate(areas))
+  exclusive_regions, overlapping_regions = {}, []
+  for key_sum, area in zip(key_sums.tolist(), region_areas.tolist()):
+    region_owners = owners[key_sum]
+    if len(region_owners) == 1:
+      exclusive_regions[region_owners[0]] = area
+    else:
+      overlapping_regions.append((region_owners, area))
+  return exclusive_regions, overlapping_regions
+
+def _group_cells(cells, disks, cell_areas, ids, keys, owners, key_sums, areas):
+  """Appends the key sum and the area of every covered cell (given by
+  pairs of cells and the disks that cover them) to key_sums and areas,
+  and records the owners of key sums that were not seen yet.
+  """
+  if len(cells) == 0:
+    return
+  order = np.argsort(cells, kind='mergesort')
+  cells, disks = cells[order], disks[order]
+  covered, starts = np.unique(cells, return_index=True)
+  cell_key_sums = np.add.reduceat(keys[disks], starts)
+  ends = np.append(starts[1:], len(cells))
+  new_sums, firsts = np.unique(cell_key_sums, return_index=True)
+  for key_sum, first in zip(new_sums.tolist(), firsts.tolist()):
+    if key_sum not in owners:
+      owners[key_sum] = ids[disks[starts[first]:ends[first]]].tolist()
+  key_sums.append(cell_key_sums)
+  areas.append(cell_areas[covered])
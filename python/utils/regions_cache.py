@@ -0,0 +1,91 @@
+import errno
+import hashlib
+import logging
+import os
+import pickle
+import numpy as np
+
+import config as cf
+
+"""Persistent cache of coverage regions (see RegionsConverter.convert).
+Regions only depend on the placement of the nodes and on the geometry
+parameters, so they are stored on disk under a hash of both and reused
+by later runs (e.g. scenarios replayed on the same placement). The
+cache is capped at REGIONS_CACHE_SIZE megabytes; the least recently used
+entries are evicted first.
+"""
+
+def _cache_dir():
+  """Directory where cache entries are stored."""
+  return os.path.join(cf.RESULTS_PATH, 'regions_cache')
+
+def regions_key(nodes):
+  """Returns the cache key of the regions covered by nodes."""
+  digest = hashlib.sha1()
+  digest.update(repr((1, cf.COVERAGE_MODEL, cf.COVERAGE_RADIUS,
+                      cf.GRID_PRECISION, cf.QUADTREE_PRECISION,
+                      cf.AREA_WIDTH, cf.AREA_LENGTH)).encode('ascii'))
+  digest.update(np.array([node.id for node in nodes], dtype=np.int64).tostring())
+  positions = [(node.pos_x, node.pos_y) for node in nodes]
+  digest.update(np.array(positions, dtype=np.float64).tostring())
+  return digest.hexdigest()
+
+def load(key):
+  """Returns the regions stored under key, or None if there are none."""
+  path = os.path.join(_cache_dir(), key)
+  try:
+    with open(path, 'rb') as cache_file:
+      regions = pickle.load(cache_file)
+  except (IOError, OSError, EOFError, pickle.UnpicklingError):
+    return None
+  # marks the entry as recently used
+  try:
+    os.utime(path, None)
+  except OSError:
+    pass
+  logging.info('regions loaded from cache (%s).' % (key))
+  return regions
+
+def store(key, regions):
+  """Stores regions under key and evicts old entries if the cache is
+  over its size.
+  """
+  cache_dir = _cache_dir()
+  try:
+    os.makedirs(cache_dir)
+  except OSError as error:
+    if error.errno != errno.EEXIST:
+      raise
+  # written to a temporary file first, so concurrent runs never read a
+  # partial entry
+  path = os.path.join(cache_dir, key)
+  tmp_path = '%s.%d.tmp' % (path, os.getpid())
+  with open(tmp_path, 'wb') as cache_file:
+    pickle.dump(regions, cache_file, pickle.HIGHEST_PROTOCOL)
+  os.rename(tmp_path, path)
+  _evict(cache_dir)
+
+def _evict(cache_dir):
+  """Removes the least recently used entries until the cache fits in
+  REGIONS_CACHE_SIZE megabytes.
+  """
+  entries = []
+  for name in os.listdir(cache_dir):
+    if name.endswith('.tmp'):
+      continue
+    try:
+      stat = os.stat(os.path.join(cache_dir, name))
+    except OSError: # removed by a concurrent run
+      continue
+    entries.append((stat.st_mtime, stat.st_size, name))
+
+  total_size = sum(size for _, size, _ in entries)
+  max_size = cf.REGIONS_CACHE_SIZE*1024*1024
+  for _, size, name in sorted(entries):
+    if total_size <= max_size:
+      break
+    try:
+      os.remove(os.path.join(cache_dir, name))
+    except OSError:
+      pass
+    total_size -= size
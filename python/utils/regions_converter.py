@@ -19,26 +19,33 @@ class RegionsConverter(list):
 
   def __init__(self, grid):
     logging.info('Creating Regions instance.')
-    self.extend(grid._exclusive_regions)
-    self._grid2regions(grid._pixels)
+    # regions indexed by their owners (frozenset of node ids)
+    self._regions_by_owners = {}
+    for region in grid._exclusive_regions:
+      self._add_region(region)
+    self._grid2regions(grid)
     #self._remove_small_regions()
     self._extract_exclusive_regions()
     logging.info(self)
 
-  def _grid2regions(self, pixels):
+  def _grid2regions(self, grid):
     """Convert a grid to regions."""
     logging.info('converting grid to regions.')
-    for x, line in pixels.iteritems():
-      for y, pixel in line.iteritems():
-        owners = set(pixels[x][y])
-        region = self._get_region(owners)
-        if region:
-          # increase area
-          region.area += self._area_single_pixel
-        else:
-          # create region
-          new_region = Region(self._area_single_pixel, owners)
-          self.append(new_region)
+    for pixel_owners in grid.get_pixel_owners():
+      owners = set(pixel_owners.tolist())
+      region = self._get_region(owners)
+      if region:
+        # increase area
+        region.area += self._area_single_pixel
+      else:
+        # create region
+        new_region = Region(self._area_single_pixel, owners)
+        self._add_region(new_region)
+
+  def _add_region(self, region):
+    """Appends a region and indexes it by its owners."""
+    self.append(region)
+    self._regions_by_owners[frozenset(region.owners)] = region
 
   def _extract_exclusive_regions(self):
     """Separate regions that overlap from regions that have a single
@@ -46,29 +53,29 @@ class RegionsConverter(list):
     """
     logging.info('extracting exclusive regions.')
     self._exclusive_regions = {}
-    del_idx = []
-    for idx, region in enumerate(self):
+    overlapping_regions = []
+    for region in self:
       if len(region.owners) == 1:
         owner = list(region.owners)[0]
         self._exclusive_regions[owner] = region.area
-        del_idx.append(idx)
-
-    for idx in del_idx[::-1]:
-        del self[idx]
+        del self._regions_by_owners[frozenset(region.owners)]
+      else:
+        overlapping_regions.append(region)
+    self[:] = overlapping_regions
 
   def _remove_small_regions(self):
     """Removing small regions improves performance."""
     logging.info('removing small regions.')
     total_coverage = self._get_total_coverage()
     #print("total coverage %f" %(total_coverage))
-    del_idx = []
-    for idx, region in enumerate(self):
+    kept_regions = []
+    for region in self:
       percentage = region.area/total_coverage
       if percentage < self._exclude_area_if:
-        del_idx.append(idx)
-
-    for idx in del_idx[::-1]:
-        del self[idx]
+        del self._regions_by_owners[frozenset(region.owners)]
+      else:
+        kept_regions.append(region)
+    self[:] = kept_regions
 
   def _get_region(self, owners):
     """Return region if owners match otherwise return 0.
@@ -76,11 +83,7 @@ class RegionsConverter(list):
     Args:
       owners (list): List of node's ids
     """
-    for region in self:
-      if owners == region.owners:
-        return region
-
-    return 0
+    return self._regions_by_owners.get(frozenset(owners), 0)
 
   def __str__(self):
     """Print all regions."""
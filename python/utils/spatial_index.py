@@ -0,0 +1,95 @@
+import numpy as np
+from scipy.spatial import cKDTree
+
+"""Spatial index (KD-tree) used by all proximity queries (neighbor
+discovery, nearest cluster head, nearest node to a centroid, routing
+graphs). It is built once from the node positions. Queries accept a
+boolean mask that selects which points are eligible (e.g. only alive
+nodes), so the index does not need to be rebuilt when nodes die.
+"""
+
+class SpatialIndex(object):
+  """Indexes a set of points. Queries return positions in the sequence
+  used to build the index.
+  """
+
+  def __init__(self, pos_x, pos_y):
+    self._points = np.column_stack((np.asarray(pos_x, dtype=float),
+                                    np.asarray(pos_y, dtype=float)))
+    self.size = len(self._points)
+    self._tree = cKDTree(self._points) if self.size else None
+
+  @classmethod
+  def from_nodes(cls, nodes):
+    """Builds the index from the nodes' positions."""
+    return cls([node.pos_x for node in nodes], [node.pos_y for node in nodes])
+
+  def radius(self, x, y, radius, mask=None):
+    """Return the positions (ascending) of the points within radius (in-
+    clusive) of (x, y) and the distances to them.
+    """
+    if self.size == 0:
+      return np.zeros(0, dtype=int), np.zeros(0)
+    idx = np.array(self._tree.query_ball_point((x, y), radius), dtype=int)
+    idx.sort()
+    if mask is not None:
+      idx = idx[mask[idx]]
+    distances = np.hypot(self._points[idx, 0] - x, self._points[idx, 1] - y)
+    return idx, distances
+
+  def k_nearest(self, xs, ys, k, mask=None):
+    """For each query point, return the positions of the k nearest eli-
+    gible points and the distances to them, sorted by distance. Missing
+    neighbors (less than k eligible points) have position -1 and distance
+    infinity.
+    """
+    queries = np.column_stack((np.atleast_1d(xs), np.atleast_1d(ys)))
+    nb_queries = len(queries)
+    positions = np.full((nb_queries, k), -1, dtype=int)
+    distances = np.full((nb_queries, k), np.inf)
+    if self.size == 0 or k == 0:
+      return positions, distances
+    nb_eligible = self.size if mask is None else np.count_nonzero(mask)
+    nb_wanted = min(k, nb_eligible)
+
+    # masked points may hide the nearest eligible ones, so queries that
+    # did not find enough of them are repeated with twice as many points
+    pending = np.arange(nb_queries)
+    nb_queried = min(k if mask is None else 2*k, self.size)
+    while len(pending):
+      found_dist, found_idx = self._tree.query(queries[pending], k=nb_queried)
+      found_dist = found_dist.reshape(len(pending), nb_queried)
+      found_idx  = found_idx.reshape(len(pending), nb_queried)
+      valid = found_idx < self.size
+      if mask is not None:
+        valid &= mask[np.minimum(found_idx, self.size-1)]
+      rank = np.cumsum(valid, axis=1)
+      rows, cols = np.nonzero(valid & (rank <= k))
+      positions[pending[rows], rank[rows, cols]-1] = found_idx[rows, cols]
+      distances[pending[rows], rank[rows, cols]-1] = found_dist[rows, cols]
+      if nb_queried == self.size:
+        break
+      pending = pending[rank[:, -1] < nb_wanted]
+      nb_queried = min(2*nb_queried, self.size)
+    return positions, distances
+
+  def nearest(self, xs, ys, mask=None):
+    """For each query point, return the position of the nearest eligible
+    point (-1 if there is none) and the distance to it.
+    """
+    positions, distances = self.k_nearest(xs, ys, 1, mask)
+    return positions[:, 0], distances[:, 0]
+
+  def pairs(self, radius, mask=None):
+    """Return every pair (i, j), i < j, of eligible points within radius
+    (inclusive) of each other, and their distances.
+    """
+    if self.size < 2:
+      return np.zeros(0, dtype=int), np.zeros(0, dtype=int), np.zeros(0)
+    pairs = self._tree.query_pairs(radius, output_type='ndarray')
+    pairs = pairs.reshape(-1, 2)
+    if mask is not None:
+      pairs = pairs[mask[pairs[:, 0]] & mask[pairs[:, 1]]]
+    first, second = pairs[:, 0], pairs[:, 1]
+    deltas = self._points[first] - self._points[second]
+    return first, second, np.hypot(deltas[:, 0], deltas[:, 1])
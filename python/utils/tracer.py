@@ -29,4 +29,5 @@ class Tracer(dict):
     self['term2_initial']   = ('term2 learning'       , rounds_label, [], 0, 1)
     self['term1_final']     = ('term1 final'          , rounds_label, [], 0, 1)
     self['term2_final']     = ('term2 final'          , rounds_label, [], 0, 1)
+    self['nb_iterations']   = ('Iterations'           , rounds_label, [], 0, 1)
 
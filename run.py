@@ -1,6 +1,9 @@
 # -*- coding: utf-8 -*-
 import logging, sys
 import inspect
+import re
+import multiprocessing
+import numpy as np
 
 import config as cf
 from python.network.network import Network
@@ -27,16 +30,7 @@ def run_scenarios():
       continue
 
     network.reset()
-
-    routing_topology, optimization, aggregation, nickname = scenario
-
-    if nickname:
-      scenario_name = nickname
-    else:
-      if optimization:
-        scenario_name = routing_topology+' + '+optimization
-      else:
-        scenario_name = routing_topology
+    scenario_name = setup_scenario(network, scenario)
 
     if scenario_name in scenario_names:
       scenario_names[scenario_name] += 1
@@ -44,17 +38,6 @@ def run_scenarios():
     else:
       scenario_names[scenario_name] = 1
 
-    routing_protocol_class          = eval(routing_topology)
-    network.routing_protocol        = routing_protocol_class()
-    if optimization:
-      sleep_scheduler_class         = eval(optimization)
-      not_class_msg = 'optimization does not hold the name of a class'
-      assert inspect.isclass(sleep_scheduler_class), not_class_msg
-      network.sleep_scheduler_class = sleep_scheduler_class
-
-    aggregation_function = aggregation + '_cost_aggregation'
-    network.set_aggregation_function(eval(aggregation_function))
-
     logging.info(scenario_name + ': running scenario...')
     traces[scenario_name] = network.simulate()
 
@@ -70,27 +53,139 @@ def run_scenarios():
   print(average_energies)
   return remaining_energies, average_energies
 
-def run_parameter_sweep():
-  
+def setup_scenario(network, scenario):
+  """Sets the routing protocol, sleep scheduler and aggregation func-
+  tion of a scenario in the network. Returns the scenario name.
+  """
+  routing_topology, optimization, aggregation, nickname = scenario
+
+  if nickname:
+    scenario_name = nickname
+  else:
+    if optimization:
+      scenario_name = routing_topology+' + '+optimization
+    else:
+      scenario_name = routing_topology
+
+  routing_protocol_class          = eval(routing_topology)
+  network.routing_protocol        = routing_protocol_class()
+  if optimization:
+    sleep_scheduler_class         = eval(optimization)
+    not_class_msg = 'optimization does not hold the name of a class'
+    assert inspect.isclass(sleep_scheduler_class), not_class_msg
+    network.sleep_scheduler_class = sleep_scheduler_class
+
+  aggregation_function = aggregation + '_cost_aggregation'
+  network.set_aggregation_function(eval(aggregation_function))
+  return scenario_name
+
+def run_job(job):
+  """Simulates one (scenario, seed, overrides) job, where overrides is a
+  dict of configuration values (e.g. {'E_ELEC': 50e-9}). The seed deter-
+  mines the node placement and every random choice of the simulation.
+  Returns the scenario name, the traces, the remaining energy and the
+  average energy.
+  """
+  scenario, seed, overrides = job
+  for key, value in overrides.items():
+    setattr(cf, key, value)
+  np.random.seed(seed)
+  network = Network()
+  scenario_name = setup_scenario(network, scenario)
+  logging.info(scenario_name + ': running scenario (seed %d)...' % (seed))
+  traces = network.simulate()
+  return (scenario_name, traces, network.get_remaining_energy(),
+          network.get_average_energy())
+
+def run_batch(jobs, nb_workers=None):
+  """Runs (scenario, seed, overrides) jobs (see run_job) in a pool of
+  nb_workers processes (default: cf.NB_WORKERS). Every job runs in a
+  fresh process, so its configuration overrides and random generators
+  (including the optimizers') do not depend on the jobs that ran before.
+  Returns a list with the results of the jobs, in the same order, and a
+  dict with all traces, keyed by scenario name, seed and overrides.
+  """
+  if nb_workers is None:
+    nb_workers = cf.NB_WORKERS
+  pool = multiprocessing.Pool(nb_workers, maxtasksperchild=1)
+  try:
+    results = pool.map(run_job, jobs, chunksize=1)
+  finally:
+    pool.close()
+    pool.join()
+
+  traces = {}
+  for (scenario, seed, overrides), result in zip(jobs, results):
+    settings = ['seed=%d' % (seed)]
+    settings += ['%s=%s' % (key, overrides[key]) for key in sorted(overrides)]
+    traces[result[0] + ' (' + ', '.join(settings) + ')'] = result[1]
+  return results, traces
+
+def scenarios_with_overrides(scenarios):
+  """Returns the (scenario, overrides) pairs described by a list in the
+  format of cf.scenarios, and the other commands of the list. Configura-
+  tion commands ("cf.X=value") become overrides of the scenarios that
+  follow them, as if they were executed in order. Commands that change
+  the network (network.*) cannot apply to jobs, which build their own
+  network, so they are skipped with a warning.
+  """
+  pairs = []
+  commands = []
+  overrides = {}
+  for scenario in scenarios:
+    if type(scenario) is not str:
+      pairs.append((scenario, dict(overrides)))
+      continue
+    override = re.match(r'^\s*cf\.(\w+)\s*=(.+)$', scenario)
+    if override:
+      overrides[override.group(1)] = eval(override.group(2))
+    elif re.match(r'^\s*network\.', scenario):
+      logging.warning('command "%s" skipped: jobs do not share a network'
+                      % (scenario))
+    else:
+      commands.append(scenario)
+  return pairs, commands
+
+def run_parameter_sweep(seeds=[0], nb_workers=None):
+  """Runs every scenario in cf.scenarios for each combination of net-
+  work width, electronics energy and seed, in parallel (see run_batch).
+  Configuration commands in cf.scenarios apply to the scenarios that
+  follow them; other commands (e.g. plots) are executed once all jobs
+  are done, on their merged traces (see scenarios_with_overrides). Each
+  seed gives a different node placement.
+  """
+  scenarios, commands = scenarios_with_overrides(cf.scenarios)
+  sweep = [(network_width, elec_energy, seed)
+           for network_width in [400, 360, 320, 280, 240, 200, 160, 120, 80, 40]
+           for elec_energy in [100e-9, 80e-9, 60e-9, 40e-9, 20e-9]
+           for seed in seeds]
+  jobs = []
+  for network_width, elec_energy, seed in sweep:
+    sweep_overrides = {'AREA_WIDTH' : network_width,
+                       'AREA_LENGTH': network_width,
+                       'BS_POS_X'   : network_width/2,
+                       'BS_POS_Y'   : network_width/2,
+                       'E_ELEC'     : elec_energy}
+    for scenario, overrides in scenarios:
+      overrides = dict(overrides, **sweep_overrides)
+      jobs.append((scenario, seed, overrides))
+  results, traces = run_batch(jobs, nb_workers)
+
+  # totals[network width][electronics energy][seed]: one value per scenario
   totals = {}
   avgs = {}
+  for idx, (network_width, elec_energy, seed) in enumerate(sweep):
+    chunk = results[idx*len(scenarios):(idx+1)*len(scenarios)]
+    totals.setdefault(network_width, {}).setdefault(elec_energy, {})[seed] = \
+      [600.0 - result[2] for result in chunk]
+    avgs.setdefault(network_width, {}).setdefault(elec_energy, {})[seed] = \
+      [result[3] for result in chunk]
 
-  for network_width in [400, 360, 320, 280, 240, 200, 160, 120, 80, 40]:
-    totals[network_width] = {}
-    avgs[network_width] = {}
-    for elec_energy in [100e-9, 80e-9, 60e-9, 40e-9, 20e-9]:
-      cf.AREA_WIDTH = network_width
-      cf.AREA_LENGTH = network_width
-      cf.BS_POS_X = network_width/2
-      cf.BS_POS_Y = network_width/2
-      cf.E_ELEC = elec_energy
-
-      remaining_energies, average_energies = run_scenarios()
-      totals[network_width][elec_energy] = remaining_energies
-      avgs[network_width][elec_energy] = average_energies
+  for command in commands:
+    exec(command)
 
   print(totals)
-  print(avgs)  
+  print(avgs)
 
 if __name__ == '__main__':
   #run_parameter_sweep()
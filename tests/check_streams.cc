@@ -0,0 +1,36 @@
+// Checks that the random streams of the tasks of a parallel batch (see
+// TaskStream in optimizer.h) do not share outputs. Run with make check.
+
+#include <stdio.h>
+#include <map>
+#include "optimizer.h"
+
+int main() {
+  const u_int kNbSeeds = 8, kNbStreams = 64, kNbDraws = 1000;
+  std::default_random_engine generator;
+  u_int nb_failures = 0;
+  for (u_int seed_idx = 0; seed_idx < kNbSeeds; seed_idx++) {
+    unsigned int seed = generator();
+    // pairs of consecutive outputs -> stream that drew them. A pair drawn
+    // by two streams means that one replays the other (a single shared
+    // value may happen by chance, a shared pair practically cannot)
+    std::map<unsigned long long, u_int> pairs;
+    for (u_int idx = 0; idx < kNbStreams; idx++) {
+      auto stream = TaskStream(seed, idx);
+      unsigned long long previous = stream();
+      for (u_int draw = 1; draw < kNbDraws; draw++) {
+        unsigned long long current = stream();
+        auto inserted = pairs.insert({(previous << 32) | current, idx});
+        if (!inserted.second && inserted.first->second != idx) {
+          printf("seed %u: streams %u and %u share outputs\n",
+                 seed, inserted.first->second, idx);
+          nb_failures++;
+          break;
+        }
+        previous = current;
+      }
+    }
+  }
+  printf(nb_failures ? "FAILED\n" : "OK\n");
+  return nb_failures ? 1 : 0;
+}